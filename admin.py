@@ -1,7 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from models import User, Service, ServiceCategory
+from sqlalchemy.orm import load_only
+from pagination import keyset_page, next_page_url
+from catalog_cache import catalog_cache
+from outbox import outbox
+from identity import identity_cache
+from exports import export_queries, stream_chunks, csv_lines, ndjson_lines
+from replicas import replica_read, router as replica_router
+from datetime import datetime
+import rollups
 
 admin_bp = Blueprint('admin', __name__, template_folder='templates')
 
@@ -20,12 +29,19 @@ def admin_required(func):
 
 
 @admin_bp.route('/dashboard')
+@replica_read
 @login_required
 @admin_required
 def dashboard():
-    users = User.query.all()
-    services = Service.query.all()
-    return render_template('admin/dashboard.html', users=users, services=services)
+    users, users_cursor = keyset_page(
+        User.query.options(load_only(User.email, User.role)), [User.id], cursor_arg='users_cursor')
+    services, services_cursor = keyset_page(
+        Service.query.options(load_only(Service.name, Service.price)), [Service.id], cursor_arg='services_cursor')
+    # Booking figures come from the rollup table only, whatever the booking history size
+    stats = rollups.summary(days=min(max(request.args.get('days', 30, type=int), 1), 366))
+    return render_template('admin/dashboard.html', users=users, services=services, stats=stats,
+                           users_next_url=next_page_url(users_cursor, 'users_cursor'),
+                           services_next_url=next_page_url(services_cursor, 'services_cursor'))
 
 
 @admin_bp.route('/categories', methods=['GET', 'POST'])
@@ -38,7 +54,53 @@ def categories():
         cat = ServiceCategory(name=name, description=desc)
         db.session.add(cat)
         db.session.commit()
+        catalog_cache.categories_changed()
         flash('Category created')
         return redirect(url_for('admin.categories'))
-    cats = ServiceCategory.query.all()
+    cats = catalog_cache.categories()
     return render_template('admin/categories.html', categories=cats)
+
+
+@admin_bp.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify({'catalog': catalog_cache.stats(), 'identity': identity_cache.stats()})
+
+
+@admin_bp.route('/outbox-stats')
+@login_required
+@admin_required
+def outbox_stats():
+    return jsonify(outbox.stats())
+
+
+@admin_bp.route('/replica-status')
+@login_required
+@admin_required
+def replica_status():
+    return jsonify(replica_router.status())
+
+
+@admin_bp.route('/bookings/export')
+@replica_read
+@login_required
+@admin_required
+def export_bookings():
+    """Stream bookings as CSV (default) or NDJSON, filtered by ``from``/``to`` dates and ``status``."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        abort(400)
+    try:
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        abort(400)
+    chunks = stream_chunks(export_queries(start, end, request.args.get('status')))
+    if fmt == 'csv':
+        body, mimetype = csv_lines(chunks), 'text/csv'
+    else:
+        body, mimetype = ndjson_lines(chunks), 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=bookings.{fmt}',
+    })
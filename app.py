@@ -1,7 +1,12 @@
 from flask import Flask
 from dotenv import load_dotenv
-from extensions import db, login_manager, mail, scheduler
+from extensions import db, login_manager, mail, migrate, scheduler
 import os
+import time
+import click
+import storage
+import instrumentation
+from replicas import router as replica_router
 
 load_dotenv()
 
@@ -9,49 +14,80 @@ load_dotenv()
 def create_app(config_object=None):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///data.sqlite')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Database URI and engine options (SQLite PRAGMAs / server pool); see storage.py
+    storage.configure(app, 'sqlite:///data.sqlite')
 
     # Mail (console)
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'localhost')
     app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 25))
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
 
+    # Availability search (opening hours, slot grid, index refresh interval in seconds)
+    app.config['BOOKING_OPEN_HOUR'] = int(os.getenv('BOOKING_OPEN_HOUR', 9))
+    app.config['BOOKING_CLOSE_HOUR'] = int(os.getenv('BOOKING_CLOSE_HOUR', 18))
+    app.config['BOOKING_SLOT_MINUTES'] = int(os.getenv('BOOKING_SLOT_MINUTES', 15))
+    app.config['AVAILABILITY_INDEX_TTL'] = int(os.getenv('AVAILABILITY_INDEX_TTL', 60))
+
+    # Reservations (lock-conflict retries, shared with the booking service)
+    app.config['BOOKING_RESERVE_ATTEMPTS'] = int(os.getenv('BOOKING_RESERVE_ATTEMPTS', 8))
+
+    # Keyset pagination (?limit= is clamped to PAGE_SIZE_MAX)
+    app.config['PAGE_SIZE_DEFAULT'] = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    app.config['PAGE_SIZE_MAX'] = int(os.getenv('PAGE_SIZE_MAX', 200))
+
+    # Rows fetched per round trip by the streaming booking export
+    app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv('EXPORT_CHUNK_SIZE', 5000))
+
+    # Service catalog cache (seconds / entries); CATALOG_CACHE_BACKEND='module:Class' for a shared backend
+    app.config['CATALOG_CACHE_TTL'] = int(os.getenv('CATALOG_CACHE_TTL', 300))
+    app.config['CATALOG_CACHE_MAX_ENTRIES'] = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 1024))
+    app.config['CATALOG_CACHE_BACKEND'] = os.getenv('CATALOG_CACHE_BACKEND')
+    # How long shared caches may serve catalog pages to anonymous visitors without revalidating
+    app.config['CATALOG_HTTP_MAX_AGE'] = int(os.getenv('CATALOG_HTTP_MAX_AGE', 60))
+
+    # Completed/cancelled bookings older than this move to booking_archive (see archive.py)
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+    app.config['ARCHIVE_BATCH_SIZE'] = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+
+    # Email outbox: in-process worker threads (0 = run `flask outbox-worker` separately)
+    app.config['OUTBOX_WORKERS'] = int(os.getenv('OUTBOX_WORKERS', 1))
+    app.config['OUTBOX_BATCH_SIZE'] = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+    app.config['OUTBOX_POLL_SECONDS'] = float(os.getenv('OUTBOX_POLL_SECONDS', 2))
+    app.config['OUTBOX_MAX_ATTEMPTS'] = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+    app.config['OUTBOX_RETRY_BASE_SECONDS'] = int(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 30))
+
+    # Reminder sweep: remind REMINDER_LEAD_HOURS before start, checked every REMINDER_SWEEP_SECONDS
+    app.config['REMINDER_LEAD_HOURS'] = int(os.getenv('REMINDER_LEAD_HOURS', 24))
+    app.config['REMINDER_SWEEP_SECONDS'] = int(os.getenv('REMINDER_SWEEP_SECONDS', 60))
+    app.config['REMINDER_BATCH_SIZE'] = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+
+    # Identity cache for the Flask-Login user loader (seconds / entries)
+    app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', 300))
+    app.config['IDENTITY_CACHE_MAX_ENTRIES'] = int(os.getenv('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+    # Password hashing: PBKDF2 cost, hashing threads (0 = inline) and how many may wait for one
+    app.config['PASSWORD_HASH_ROUNDS'] = int(os.getenv('PASSWORD_HASH_ROUNDS', 29000))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+
+    # Metrics: statements slower than this are logged; PROFILE_ENDPOINTS='bookings.list_bookings,...' or '*'
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 100))
+    app.config['PROFILE_ENDPOINTS'] = os.getenv('PROFILE_ENDPOINTS', '')
+
+    # Read replicas: DATABASE_REPLICA_URLS, REPLICA_CHECK_SECONDS, REPLICA_MAX_LAG_SECONDS
+    # and READ_AFTER_WRITE_SECONDS (see replicas.py)
+    replica_router.init_app(app)
+
     db.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-        # Add initial data if database is empty
-        if not os.path.exists('instance/data.sqlite'):
-            from models import User, Role, ServiceCategory
-            # Create admin user
-            admin = User.query.filter_by(email='admin@example.com').first()
-            if not admin:
-                admin = User(
-                    email='admin@example.com',
-                    name='Admin User',
-                    role=Role.ADMIN
-                )
-                admin.set_password('admin123')  # Change this in production!
-                db.session.add(admin)
-            
-            # Create default service categories
-            categories = ['Haircut', 'Massage', 'Nail Care', 'Facial']
-            for cat_name in categories:
-                if not ServiceCategory.query.filter_by(name=cat_name).first():
-                    cat = ServiceCategory(name=cat_name)
-                    db.session.add(cat)
-            
-            db.session.commit()
-
-    from models import User
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+
+    from identity import identity_cache
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return identity_cache.load(int(user_id))
 
     # Blueprints
     from auth import auth_bp
@@ -64,16 +100,114 @@ def create_app(config_object=None):
     app.register_blueprint(bookings_bp, url_prefix='/bookings')
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
-    # Scheduler
-    scheduler.start()
+    # Route latency, query counts, slow-query log and /metrics
+    instrumentation.init_app(app, 'monolith')
+
+    # Creating the app touches neither the database nor any threads: run
+    # `flask bootstrap` once per deployment and start_background() (or
+    # `flask worker`) where the reminder sweep and outbox should run.
+
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Apply migrations and seed the default data."""
+        from bootstrap import bootstrap
+
+        for item in bootstrap(app):
+            click.echo(f'Created {item}')
+        click.echo('Database is up to date')
+
+    @app.cli.command('worker')
+    @click.option('--outbox-workers', default=None, type=int, help='Number of sender threads.')
+    def worker(outbox_workers):
+        """Run the reminder sweep and the email outbox until interrupted."""
+        start_background(app, outbox_workers)
+        wait_forever()
+
+    @app.cli.command('outbox-worker')
+    @click.option('--workers', default=4, help='Number of sender threads.')
+    def outbox_worker(workers):
+        """Drain the email outbox until interrupted."""
+        from outbox import outbox
+
+        outbox.start(app, workers)
+        wait_forever()
+
+    @app.cli.command('rollups-backfill')
+    @click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), help='First day (inclusive).')
+    @click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']), help='Last day (exclusive).')
+    def rollups_backfill(start, end):
+        """Rebuild the dashboard rollups from the booking table."""
+        from rollups import backfill
+
+        written = backfill(start and start.date(), end and end.date())
+        click.echo(f'{written} rollup rows written')
+
+    @app.cli.command('archive-bookings')
+    @click.option('--days', type=int, help='Archive bookings that ended this many days ago (default ARCHIVE_AFTER_DAYS).')
+    @click.option('--batch-size', type=int, help='Rows moved per transaction.')
+    def archive_bookings_command(days, batch_size):
+        """Move old completed and cancelled bookings to the archive table."""
+        from datetime import datetime, timedelta
+        from archive import archive_bookings
+
+        before = datetime.utcnow() - timedelta(days=days) if days is not None else None
+        moved = archive_bookings(before, batch_size)
+        click.echo(f'{moved} bookings archived')
+
+    @app.cli.command('replica-copy')
+    @click.argument('path')
+    @click.option('--every', type=float, help='Refresh the copy every SECONDS until interrupted.')
+    def replica_copy(path, every):
+        """Copy the SQLite primary to PATH, a read-only replica for DATABASE_REPLICA_URLS."""
+        from replicas import copy_sqlite
+
+        primary = db.engine.url.database
+        while True:
+            copy_sqlite(primary, path)
+            click.echo(f'Copied {primary} to {path}')
+            if not every:
+                break
+            time.sleep(every)
 
     return app
 
 
+def start_background(app, outbox_workers=None):
+    """Start the reminder sweep, the daily archive run and the email outbox threads for ``app``."""
+    from archive import schedule_archive
+    from outbox import outbox
+    from reminders import schedule_reminder_sweep
+
+    # A single reminder sweep job; safe to run in every worker process
+    schedule_reminder_sweep(app, scheduler)
+    schedule_archive(app, scheduler)
+    if not scheduler.running:
+        scheduler.start()
+
+    workers = app.config['OUTBOX_WORKERS'] if outbox_workers is None else outbox_workers
+    if workers:
+        outbox.start(app, workers)
+
+
+def wait_forever():
+    from outbox import outbox
+
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        outbox.stop()
+        scheduler.shutdown(wait=False)
+
+
 if __name__ == '__main__':
     # Allows running with: python app.py
     # Uses PORT and HOST environment variables when present (PowerShell example below)
+    from bootstrap import bootstrap
+
     app = create_app()
+    bootstrap(app)
+    start_background(app)
     host = os.getenv('HOST', '127.0.0.1')
     port = int(os.getenv('PORT', 5000))
     # Set FLASK_DEBUG=1 to enable debug mode when running directly
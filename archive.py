@@ -0,0 +1,117 @@
+"""
+Hot/cold split for bookings.
+
+Completed and cancelled bookings that ended more than ``ARCHIVE_AFTER_DAYS``
+ago are moved from ``booking`` to ``booking_archive``. The hot table behind
+availability, reservations, reminders and the current calendar then holds
+only recent and upcoming bookings, however long the history grows.
+
+``archive_bookings`` moves ``ARCHIVE_BATCH_SIZE`` rows per transaction (copy,
+then delete), so an interrupted run loses nothing and the next run carries
+on where it stopped. It runs daily in the worker and as
+``flask archive-bookings``.
+
+History reads cover both tables: ``merged_page`` pages them with one keyset
+and merges the two pages, ``history`` is a UNION ALL for aggregates and
+exports, and ``reaches`` tells whether a time window can hold archived rows.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, insert, literal, select, union_all
+
+from extensions import db
+from models import ArchivedBooking, Booking
+from pagination import encode_cursor, keyset_page, page_size
+
+COLUMNS = ('id', 'user_id', 'service_id', 'staff_id', 'start_time', 'end_time', 'status', 'notes', 'created_at')
+# Only bookings in a final state are archived
+STATUSES = ('completed', 'cancelled')
+
+
+def horizon(now=None):
+    return (now or datetime.utcnow()) - timedelta(days=current_app.config.get('ARCHIVE_AFTER_DAYS', 180))
+
+
+def archive_bookings(before=None, batch_size=None):
+    """Move final bookings that ended before ``before`` (default: the horizon); returns the count."""
+    before = before or horizon()
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 1000)
+    # SQLite gives the next insert max(id) + 1, so moving the newest row would
+    # let its id be reused in the hot table; it is archived on a later run.
+    newest = db.session.query(func.max(Booking.id)).scalar() or 0
+    due = and_(Booking.start_time < before, Booking.end_time < before,
+               Booking.status.in_(STATUSES), Booking.id < newest)
+    moved = 0
+    while True:
+        ids = [row.id for row in db.session.query(Booking.id).filter(due).limit(batch_size)]
+        if not ids:
+            break
+        batch = and_(Booking.id.in_(ids), due)
+        source = select(*[getattr(Booking, c) for c in COLUMNS], literal(datetime.utcnow())).where(batch)
+        db.session.execute(insert(ArchivedBooking).from_select(COLUMNS + ('archived_at',), source))
+        db.session.execute(delete(Booking).where(batch))
+        db.session.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+    return moved
+
+
+def schedule_archive(app, scheduler):
+    """Register the daily archive run on ``scheduler``."""
+
+    def run():
+        with app.app_context():
+            try:
+                moved = archive_bookings()
+                if moved:
+                    app.logger.info('Archived %d bookings', moved)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning('Booking archive failed: %s', e)
+
+    scheduler.add_job(func=run, trigger='interval', hours=24, id='booking_archive',
+                      replace_existing=True, max_instances=1, coalesce=True)
+
+
+def reaches(start):
+    """Whether bookings starting at or after ``start`` may include archived ones."""
+    if start >= datetime.utcnow():
+        return False
+    newest = db.session.query(func.max(ArchivedBooking.start_time)).scalar()
+    return newest is not None and newest >= start
+
+
+def history(start=None, end=None):
+    """Hot and archived bookings starting in ``[start, end)`` as one subquery with COLUMNS."""
+    parts = []
+    for model in (Booking, ArchivedBooking):
+        part = select(*[getattr(model, c) for c in COLUMNS])
+        if start is not None:
+            part = part.where(model.start_time >= start)
+        if end is not None:
+            part = part.where(model.start_time < end)
+        parts.append(part)
+    return union_all(*parts).subquery('booking_history')
+
+
+def merged_page(hot, cold, descending=False):
+    """Keyset page over two queries, on ``Booking`` and ``ArchivedBooking``, by (start_time, id).
+
+    Each side returns at most a page after the shared cursor, so the first
+    page of their merge is the page of the union. When the hot side fills the
+    page, archived rows past its last one cannot make it in and are not read.
+    Returns ``(rows, next_cursor)``.
+    """
+    size = page_size()
+    hot_rows, hot_next = keyset_page(hot, [Booking.start_time, Booking.id], descending, size=size)
+    if hot_next:
+        last = hot_rows[-1].start_time
+        cold = cold.filter(ArchivedBooking.start_time >= last if descending else ArchivedBooking.start_time <= last)
+    cold_rows, cold_next = keyset_page(cold, [ArchivedBooking.start_time, ArchivedBooking.id], descending, size=size)
+    rows = sorted(hot_rows + cold_rows, key=lambda b: (b.start_time, b.id), reverse=descending)
+    more = len(rows) > size or hot_next or cold_next
+    rows = rows[:size]
+    next_cursor = encode_cursor([rows[-1].start_time, rows[-1].id]) if more and rows else None
+    return rows, next_cursor
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from app import db
 from models import User, Role
+from availability import availability_index
+from identity import identity_cache
+from passwords import HashingBusy
 from flask_login import login_user, logout_user, login_required, current_user
 
 auth_bp = Blueprint('auth', __name__)
@@ -22,9 +25,15 @@ def register():
             flash('Email already registered')
             return redirect(url_for('auth.register'))
         user = User(email=email, name=name, role=role)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusy:
+            flash('Server busy, please try again in a moment')
+            return render_template('register.html'), 503
         db.session.add(user)
         db.session.commit()
+        if user.role == Role.STAFF:
+            availability_index.add_staff(user.id)
         flash('Registered successfully')
         return redirect(url_for('auth.login'))
     return render_template('register.html')
@@ -36,9 +45,17 @@ def login():
         email = request.form['email']
         password = request.form['password']
         user = User.query.filter_by(email=email).first()
-        if not user or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('Too many sign-in attempts right now, please try again in a moment')
+            return render_template('login.html'), 503
+        if not valid:
             flash('Invalid credentials')
             return redirect(url_for('auth.login'))
+        if user in db.session.dirty:
+            # password hash was upgraded to the current cost
+            db.session.commit()
         login_user(user)
         flash('Logged in')
         return redirect(url_for('services.list_services'))
@@ -56,9 +73,12 @@ def logout():
 @auth_bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
+    # current_user is a cached snapshot; edit the real row
+    user = db.session.get(User, current_user.id)
     if request.method == 'POST':
-        current_user.name = request.form.get('name')
-        current_user.phone = request.form.get('phone')
+        user.name = request.form.get('name')
+        user.phone = request.form.get('phone')
         db.session.commit()
+        identity_cache.invalidate(user.id)
         flash('Profile updated')
-    return render_template('profile.html')
+    return render_template('profile.html', user=user)
@@ -0,0 +1,190 @@
+"""
+In-memory staff availability index.
+
+Keeps, per staff member, the booked intervals sorted by start time so that
+free-slot searches are a bisect plus a short forward sweep instead of a scan
+of the bookings table. The index is loaded lazily from the database, kept up
+to date by the booking views (book/release), and rebuilt after a TTL so that
+writes made by other worker processes are eventually picked up.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._staff = {}      # staff_id -> (starts, ends, ids), sorted by start
+        self._bookings = {}   # booking_id -> (staff_id, start, end)
+        self._max_len = {}    # staff_id -> longest booking, bounds the backwards bisect
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        ttl = current_app.config.get('AVAILABILITY_INDEX_TTL', 60)
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < ttl:
+            return
+        self.reload()
+
+    def reload(self):
+        from models import Booking, User, Role
+
+        staff_ids = [row.id for row in db.session.query(User.id).filter(User.role == Role.STAFF)]
+        rows = (
+            db.session.query(Booking.id, Booking.staff_id, Booking.start_time, Booking.end_time)
+            .filter(
+                Booking.status == 'booked',
+                Booking.staff_id.isnot(None),
+                Booking.end_time > datetime.utcnow(),
+            )
+            .order_by(Booking.staff_id, Booking.start_time)
+            .all()
+        )
+        staff, bookings, max_len = {}, {}, {}
+        for staff_id in staff_ids:
+            staff[staff_id] = ([], [], [])
+            max_len[staff_id] = timedelta(0)
+        for booking_id, staff_id, start, end in rows:
+            starts, ends, ids = staff.setdefault(staff_id, ([], [], []))
+            starts.append(start)
+            ends.append(end)
+            ids.append(booking_id)
+            bookings[booking_id] = (staff_id, start, end)
+            max_len[staff_id] = max(max_len.get(staff_id, timedelta(0)), end - start)
+        with self._lock:
+            self._staff, self._bookings, self._max_len = staff, bookings, max_len
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def book(self, booking):
+        """Record a committed booking in the index."""
+        if booking.staff_id is None or booking.status != 'booked' or self._loaded_at is None:
+            return
+        staff_id = int(booking.staff_id)
+        with self._lock:
+            if booking.id in self._bookings:
+                return
+            starts, ends, ids = self._staff.setdefault(staff_id, ([], [], []))
+            pos = bisect_left(starts, booking.start_time)
+            starts.insert(pos, booking.start_time)
+            ends.insert(pos, booking.end_time)
+            ids.insert(pos, booking.id)
+            self._bookings[booking.id] = (staff_id, booking.start_time, booking.end_time)
+            length = booking.end_time - booking.start_time
+            if length > self._max_len.get(staff_id, timedelta(0)):
+                self._max_len[staff_id] = length
+
+    def release(self, booking):
+        """Drop a cancelled (or deleted) booking from the index."""
+        with self._lock:
+            entry = self._bookings.pop(booking.id, None)
+            if entry is None:
+                return
+            staff_id, start, _ = entry
+            starts, ends, ids = self._staff[staff_id]
+            pos = bisect_left(starts, start)
+            while ids[pos] != booking.id:
+                pos += 1
+            del starts[pos], ends[pos], ids[pos]
+
+    def add_staff(self, staff_id):
+        with self._lock:
+            self._staff.setdefault(staff_id, ([], [], []))
+
+    def staff_ids(self):
+        self._ensure_loaded()
+        return sorted(self._staff)
+
+    def is_free(self, staff_id, start, end):
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._staff.get(int(staff_id))
+            if entry is None:
+                return False
+            starts, ends, _ = entry
+            lo = bisect_left(starts, start - self._max_len.get(int(staff_id), timedelta(0)))
+            hi = bisect_left(starts, end)
+            return all(ends[i] <= start for i in range(lo, hi))
+
+    def pick_staff(self, start, end):
+        """Return the first staff member free for ``[start, end)``, or None."""
+        for staff_id in self.staff_ids():
+            if self.is_free(staff_id, start, end):
+                return staff_id
+        return None
+
+    def free_slots(self, duration_minutes, start, end, staff_id=None, limit=10):
+        """Next ``limit`` free slots of ``duration_minutes`` within ``[start, end)``.
+
+        Returns a list of ``(slot_start, staff_id)`` tuples in time order. With
+        ``staff_id=None`` every staff member is considered and each start time
+        is reported once, for the first staff member free at that time.
+        """
+        self._ensure_loaded()
+        duration = timedelta(minutes=duration_minutes)
+        with self._lock:
+            if staff_id is not None:
+                candidates = [int(staff_id)] if int(staff_id) in self._staff else []
+            else:
+                candidates = sorted(self._staff)
+            streams = [
+                self._sweep(sid, self._staff[sid], duration, start, end)
+                for sid in candidates
+            ]
+            slots, last = [], None
+            for slot_start, sid in heapq.merge(*streams):
+                if slot_start == last:
+                    continue
+                slots.append((slot_start, sid))
+                last = slot_start
+                if len(slots) >= limit:
+                    break
+            return slots
+
+    def _sweep(self, staff_id, entry, duration, start, end):
+        cfg = current_app.config
+        step = timedelta(minutes=cfg.get('BOOKING_SLOT_MINUTES', 15))
+        open_hour = cfg.get('BOOKING_OPEN_HOUR', 9)
+        close_hour = cfg.get('BOOKING_CLOSE_HOUR', 18)
+        starts, ends, _ = entry
+        pos = bisect_left(starts, start - self._max_len.get(staff_id, timedelta(0)))
+        busy_until = start
+        t = _align(start, step)
+        while t + duration <= end:
+            day_open = t.replace(hour=open_hour, minute=0, second=0, microsecond=0)
+            day_close = t.replace(hour=close_hour, minute=0, second=0, microsecond=0)
+            if t < day_open:
+                t = day_open
+                continue
+            if t + duration > day_close:
+                t = day_open + timedelta(days=1)
+                continue
+            while pos < len(starts) and starts[pos] < t + duration:
+                if ends[pos] > busy_until:
+                    busy_until = ends[pos]
+                pos += 1
+            if busy_until > t:
+                t = _align(busy_until, step)
+                continue
+            yield t, staff_id
+            t += step
+
+
+def _align(moment, step):
+    """Round ``moment`` up to the next multiple of ``step`` within its day."""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = moment - midnight
+    steps = -(-offset // step)
+    return midnight + steps * step
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,133 @@
+"""
+Hot-path latency as booking history grows, with and without archiving.
+
+For each history length a fresh database is generated (``datagen.py``) and
+the hot paths are timed: the reservation conflict check, the reminder sweep
+query, a staff member's current calendar week and their booking history page.
+Then ``archive_bookings`` moves everything past ``--archive-days`` and the same
+paths are timed again. Exits non-zero if, after archiving, a path on the
+longest history is slower than on the shortest by more than ``--tolerance``.
+
+    python benchmarks/archive_growth.py --history-days 30 180 720 --staff 20
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(fn, reps):
+    samples = []
+    for _ in range(reps):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def hot_paths(client):
+    from extensions import db
+    from models import Booking
+
+    now = datetime.utcnow()
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
+
+    def conflict_check():
+        db.session.query(Booking.staff_id, Booking.start_time, Booking.end_time).filter(
+            Booking.staff_id == 1, Booking.status != 'cancelled',
+            Booking.start_time < day + timedelta(days=1), Booking.end_time > day).all()
+        db.session.rollback()
+
+    def reminder_due():
+        db.session.query(Booking.id).filter(
+            Booking.status == 'booked', Booking.start_time > now, Booking.start_time <= now + timedelta(hours=24),
+            Booking.reminder_sent_at.is_(None)).order_by(Booking.start_time).limit(500).all()
+        db.session.rollback()
+
+    return {
+        'conflict check': conflict_check,
+        'reminder sweep': reminder_due,
+        'staff calendar week': lambda: client.get('/bookings/calendar'),
+        'staff history page': lambda: client.get('/bookings/'),
+    }
+
+
+def measure(history_days, args, results):
+    db_path = os.path.join(tempfile.mkdtemp(), 'archive.sqlite')
+    os.environ.update({'DATABASE_URL': f'sqlite:///{db_path}', 'OUTBOX_WORKERS': '0',
+                       'ARCHIVE_AFTER_DAYS': str(args.archive_days)})
+    from app import create_app
+    from bootstrap import bootstrap
+    from datagen import PASSWORD, generate
+    from archive import archive_bookings
+    from extensions import db
+    from models import ArchivedBooking, Booking
+
+    app = create_app()
+    bootstrap(app)
+    client = app.test_client()
+    with app.app_context():
+        generate(args.users, args.staff, args.services, history_days, args.future_days)
+    client.post('/login', data={'email': 'staff0@example.com', 'password': PASSWORD})
+
+    row = {'history_days': history_days}
+    with app.app_context():
+        for name, fn in hot_paths(client).items():
+            row[name] = [timed(fn, args.reps)]
+        started = time.perf_counter()
+        moved = archive_bookings()
+        row['archive_seconds'] = time.perf_counter() - started
+        row['moved'] = moved
+        row['hot_rows'] = db.session.query(Booking).count()
+        row['archived_rows'] = db.session.query(ArchivedBooking).count()
+        db.session.rollback()
+        for name, fn in hot_paths(client).items():
+            row[name].append(timed(fn, args.reps))
+    results.put(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--history-days', type=int, nargs='+', default=[30, 180, 720])
+    parser.add_argument('--archive-days', type=int, default=30)
+    parser.add_argument('--future-days', type=int, default=30)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--services', type=int, default=30)
+    parser.add_argument('--reps', type=int, default=200)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for days in args.history_days:
+        results = ctx.Queue()
+        proc = ctx.Process(target=measure, args=(days, args, results))
+        proc.start()
+        rows.append(results.get())
+        proc.join()
+
+    paths = [k for k, v in rows[0].items() if isinstance(v, list)]
+    for row in rows:
+        print(f'{row["history_days"]:>5} days: {row["hot_rows"]} hot + {row["archived_rows"]} archived bookings '
+              f'({row["moved"]} moved in {row["archive_seconds"]:.1f}s)')
+        for name in paths:
+            before, after = row[name]
+            print(f'    {name:<22} {before:9.0f} us -> {after:9.0f} us after archiving')
+
+    slower = [name for name in paths if rows[-1][name][1] > rows[0][name][1] * (1 + args.tolerance)]
+    if slower:
+        print('not flat after archiving:', ', '.join(slower))
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == '__main__':
+    main()
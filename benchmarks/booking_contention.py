@@ -0,0 +1,144 @@
+"""
+Contention benchmark for the booking reservation path.
+
+Many threads (or processes) hammer a small pool of staff/slot combinations
+through ``reservations.reserve_booking``. At the end the database is checked
+for overlapping active bookings and the achieved throughput is printed.
+
+    python benchmarks/booking_contention.py --workers 8 --attempts 200
+    python benchmarks/booking_contention.py --processes --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+BASE = datetime(2030, 1, 7, 9, 0)
+
+
+def make_app(db_path):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['OUTBOX_WORKERS'] = '0'
+    from app import create_app
+    return create_app()
+
+
+def setup(app, staff_count):
+    from bootstrap import bootstrap
+    from extensions import db
+    from models import User, Service, Role
+
+    bootstrap(app)
+    with app.app_context():
+        customer = User(email='load@example.com', name='Load', role=Role.CUSTOMER)
+        customer.set_password('x')
+        db.session.add(customer)
+        for i in range(staff_count):
+            staff = User(email=f'staff{i}@example.com', name=f'Staff {i}', role=Role.STAFF)
+            staff.set_password('x')
+            db.session.add(staff)
+        db.session.add(Service(name='Bench', description='', price=10.0, duration_minutes=30))
+        db.session.commit()
+        staff_ids = [u.id for u in User.query.filter_by(role=Role.STAFF)]
+        return customer.id, Service.query.first().id, staff_ids
+
+
+def hammer(app, db_path, customer_id, service_id, staff_ids, slots, attempts, seed, results):
+    """Worker body; ``app`` is None in process mode, where each worker builds its own."""
+    from reservations import reserve_booking
+
+    if app is None:
+        app = make_app(db_path)
+    rnd = random.Random(seed)
+    booked = rejected = 0
+    try:
+        with app.app_context():
+            for _ in range(attempts):
+                # 15 minute offsets on a 30 minute service: neighbouring slots overlap too
+                start = BASE + timedelta(minutes=15 * rnd.randrange(slots))
+                booking = reserve_booking(
+                    user_id=customer_id,
+                    service_id=service_id,
+                    staff_id=rnd.choice(staff_ids),
+                    start_time=start,
+                    end_time=start + timedelta(minutes=30),
+                )
+                if booking is None:
+                    rejected += 1
+                else:
+                    booked += 1
+    finally:
+        results.put((booked, rejected))
+
+
+def count_overlaps(app):
+    from sqlalchemy import text
+    from extensions import db
+
+    with app.app_context():
+        return db.session.execute(text(
+            "SELECT COUNT(*) FROM booking a JOIN booking b "
+            "ON a.staff_id = b.staff_id AND a.id < b.id "
+            "AND a.status = 'booked' AND b.status = 'booked' "
+            "AND a.start_time < b.end_time AND b.start_time < a.end_time"
+        )).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=200, help='reservations attempted per worker')
+    parser.add_argument('--staff', type=int, default=3)
+    parser.add_argument('--slots', type=int, default=32, help='distinct start times per staff member')
+    parser.add_argument('--processes', action='store_true', help='use processes instead of threads')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'contention.sqlite')
+    app = make_app(db_path)
+    customer_id, service_id, staff_ids = setup(app, args.staff)
+
+    if args.processes:
+        # spawn, not fork: each worker process builds its own app and connections
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        spawn = ctx.Process
+        shared_app = None
+    else:
+        import queue
+        results = queue.Queue()
+        spawn = threading.Thread
+        shared_app = app
+
+    workers = [
+        spawn(target=hammer, args=(shared_app, db_path, customer_id, service_id, staff_ids,
+                                   args.slots, args.attempts, seed, results))
+        for seed in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    totals = [results.get() for _ in workers]
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    booked = sum(t[0] for t in totals)
+    rejected = sum(t[1] for t in totals)
+    overlaps = count_overlaps(app)
+    mode = 'processes' if args.processes else 'threads'
+    print(f'{args.workers} {mode}, {booked + rejected} attempts in {elapsed:.2f}s')
+    print(f'booked={booked} rejected={rejected} overlaps={overlaps}')
+    print(f'{(booked + rejected) / elapsed:.1f} attempts/sec, {booked / elapsed:.1f} bookings/sec')
+    sys.exit(1 if overlaps else 0)
+
+
+if __name__ == '__main__':
+    main()
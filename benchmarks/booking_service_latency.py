@@ -0,0 +1,97 @@
+"""
+Per-booking latency of the booking microservice against local stand-ins.
+
+Starts stub auth, catalog and notification services with a configurable
+response delay, then times POST /bookings on the booking service, whose
+access token is checked locally. ``--baseline``
+instead times the former inter-service pattern: a fresh ``requests.get`` to
+the catalog plus a blocking ``requests.post`` to the notification service
+per booking, with new connections and no cache.
+
+    python benchmarks/booking_service_latency.py --bookings 300 --delay 0.02
+    python benchmarks/booking_service_latency.py --bookings 300 --delay 0.02 --baseline
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_services import access_token, auth_stub, catalog_stub, notification_stub  # noqa: E402
+
+
+def load_service(name):
+    path = os.path.join(ROOT, 'services', name, 'app.py')
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    pick = lambda pct: 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    print(f'{label}: n={len(ordered)} mean={1000 * sum(ordered) / len(ordered):.1f}ms '
+          f'p50={pick(50):.1f}ms p99={pick(99):.1f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bookings', type=int, default=300)
+    parser.add_argument('--delay', type=float, default=0.02, help='stub response delay (s)')
+    parser.add_argument('--baseline', action='store_true')
+    args = parser.parse_args()
+
+    catalog = catalog_stub(args.delay).start()
+    notifier = notification_stub(args.delay).start()
+    samples = []
+
+    if args.baseline:
+        import requests
+
+        for i in range(args.bookings):
+            started = time.perf_counter()
+            requests.get(f'{catalog.url}/services/{1 + i % 5}')
+            requests.post(f'{notifier.url}/notifications', json={'type': 'booking_created', 'booking_id': i})
+            samples.append(time.perf_counter() - started)
+        report('baseline inter-service calls only', samples)
+        return
+
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bookings.sqlite'),
+        'SERVICE_CATALOG_URL': catalog.url,
+        'NOTIFICATION_SERVICE_URL': notifier.url,
+        'AUTH_SERVICE_URL': auth_stub(args.delay).start().url,
+    })
+    service = load_service('booking-service')
+    with service.app.app_context():
+        from flask_migrate import upgrade
+        upgrade()
+    client = service.app.test_client()
+    headers = {'Authorization': f'Bearer {access_token(1)}'}
+    start = datetime(2030, 1, 1, 9)
+    for i in range(args.bookings):
+        slot = start + timedelta(minutes=30 * i)
+        payload = {
+            'user_id': 1, 'service_id': 1 + i % 5, 'staff_id': 1 + i % 3,
+            'start_time': slot.isoformat(), 'end_time': (slot + timedelta(minutes=30)).isoformat(),
+        }
+        started = time.perf_counter()
+        response = client.post('/bookings', json=payload, headers=headers)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 201, response.get_data(as_text=True)
+    report('POST /bookings (pooled, cached, queued notify)', samples)
+    deadline = time.time() + 30
+    while service.notifications.queue_depth() and time.time() < deadline:
+        time.sleep(0.05)
+    print(f'catalog requests={catalog.requests} notifications delivered={notifier.requests}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Synthetic data generator.
+
+Fills a database with customers, staff, services and a realistic booking
+history: every staff member works the configured opening hours each day with
+back-to-back bookings separated by random gaps, past bookings are mostly
+completed with some cancellations, future ones are mostly booked. Rows are
+produced by generators and written with chunked executemany inserts, so
+millions of rows take seconds to minutes rather than hours. All generated
+users share one password hash (``password``); the generator is deterministic
+for a given ``--seed``.
+
+    python benchmarks/datagen.py --db /tmp/big.sqlite --users 1000000 --staff 100 --past-days 365
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'password'
+DURATIONS = [15, 30, 30, 45, 60, 60, 90]
+
+
+def user_rows(count, role, password_hash, start=0, phone=True):
+    for i in range(start, start + count):
+        row = {'email': f'{role}{i}@example.com', 'name': f'{role.title()} {i}', 'role': role,
+               'password_hash': password_hash}
+        if phone:
+            row['phone'] = f'555-{i:07d}'
+        yield row
+
+
+def service_rows(count, category_ids, rnd):
+    for i in range(count):
+        yield {
+            'name': f'Service {i}',
+            'description': f'Synthetic service {i}',
+            'price': float(rnd.randrange(10, 150)),
+            'duration_minutes': rnd.choice(DURATIONS),
+            'category_id': rnd.choice(category_ids) if category_ids else None,
+        }
+
+
+def booking_rows(staff_ids, customer_ids, services, first_day, days, rnd, now=None,
+                 open_hour=9, close_hour=18, busy=0.7):
+    """Yield non-overlapping bookings per staff member and day.
+
+    ``services`` is a list of ``(id, duration_minutes)``; ``busy`` is roughly
+    the share of opening hours that ends up booked.
+    """
+    now = now or datetime.utcnow()
+    for day in range(days):
+        date = first_day + timedelta(days=day)
+        opens = date.replace(hour=open_hour, minute=0, second=0, microsecond=0)
+        closes = date.replace(hour=close_hour, minute=0, second=0, microsecond=0)
+        for staff_id in staff_ids:
+            start = opens
+            while True:
+                if rnd.random() > busy:
+                    start += timedelta(minutes=15 * rnd.randint(1, 4))
+                service_id, minutes = rnd.choice(services)
+                end = start + timedelta(minutes=minutes)
+                if end > closes:
+                    break
+                roll = rnd.random()
+                if end <= now:
+                    status = 'completed' if roll < 0.85 else 'cancelled' if roll < 0.95 else 'booked'
+                else:
+                    status = 'booked' if roll < 0.9 else 'cancelled'
+                yield {
+                    'user_id': rnd.choice(customer_ids),
+                    'service_id': service_id,
+                    'staff_id': staff_id,
+                    'start_time': start,
+                    'end_time': end,
+                    'status': status,
+                    'notes': None,
+                    'created_at': start - timedelta(days=rnd.randint(0, 30), minutes=rnd.randint(0, 600)),
+                }
+                start = end
+
+
+def bulk_insert(session, table, rows, chunk=20000):
+    """executemany ``rows`` into ``table`` ``chunk`` rows at a time; returns the row count."""
+    from sqlalchemy import insert
+
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            session.execute(insert(table), batch)
+            session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(table), batch)
+        session.commit()
+        total += len(batch)
+    return total
+
+
+def generate(users=10000, staff=20, services=30, past_days=90, future_days=30, seed=1, busy=0.7):
+    """Fill the monolith database of the current app context; returns row counts."""
+    from flask import current_app
+    from extensions import db
+    from models import Booking, Role, Service, ServiceCategory, User
+    from passwords import password_hasher
+    import rollups
+
+    rnd = random.Random(seed)
+    password_hash = password_hasher.context().hash(PASSWORD)
+    counts = {
+        'staff': bulk_insert(db.session, User, user_rows(staff, Role.STAFF, password_hash)),
+        'customers': bulk_insert(db.session, User, user_rows(users, Role.CUSTOMER, password_hash)),
+    }
+    category_ids = [c.id for c in ServiceCategory.query]
+    counts['services'] = bulk_insert(db.session, Service, service_rows(services, category_ids, rnd))
+
+    staff_ids = [row.id for row in db.session.query(User.id).filter(User.role == Role.STAFF)]
+    customer_ids = [row.id for row in db.session.query(User.id).filter(User.role == Role.CUSTOMER)]
+    service_list = db.session.query(Service.id, Service.duration_minutes).all()
+    first_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=past_days)
+    cfg = current_app.config
+    counts['bookings'] = bulk_insert(db.session, Booking, booking_rows(
+        staff_ids, customer_ids, service_list, first_day, past_days + future_days, rnd,
+        open_hour=cfg.get('BOOKING_OPEN_HOUR', 9), close_hour=cfg.get('BOOKING_CLOSE_HOUR', 18), busy=busy))
+    counts['rollups'] = rollups.backfill()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create or extend')
+    parser.add_argument('--users', type=int, default=10000, help='customers')
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--services', type=int, default=30)
+    parser.add_argument('--past-days', type=int, default=90)
+    parser.add_argument('--future-days', type=int, default=30)
+    parser.add_argument('--busy', type=float, default=0.7, help='share of opening hours booked')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(args.db)
+    from app import create_app
+    from bootstrap import bootstrap
+
+    app = create_app()
+    bootstrap(app)
+    started = time.perf_counter()
+    with app.app_context():
+        counts = generate(args.users, args.staff, args.services, args.past_days, args.future_days,
+                          args.seed, args.busy)
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(', '.join(f'{v} {k}' for k, v in counts.items()) + f' in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)')
+
+
+if __name__ == '__main__':
+    main()
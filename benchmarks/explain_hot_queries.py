@@ -0,0 +1,115 @@
+"""
+Check that the hot booking queries are served by the composite indexes.
+
+Runs the same builders the views and jobs use (the booking history page,
+the calendar feed, the reminder sweep) against a freshly migrated database,
+captures the SELECTs they send and runs EXPLAIN QUERY PLAN (SQLite) on each.
+Exits non-zero if a booking table is read without its expected index, or
+with a full table scan, so the check follows the view code as it changes.
+
+    python benchmarks/explain_hot_queries.py
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def hot_queries():
+    """name -> (callable issuing the queries, {table: expected index})."""
+    import calendars
+    from bookings import history_page
+    from models import Role
+    from reminders import sweep_reminders
+
+    admin = SimpleNamespace(id=1, role=Role.ADMIN)
+    staff = SimpleNamespace(id=1, role=Role.STAFF)
+    customer = SimpleNamespace(id=1, role=Role.CUSTOMER)
+    start, end = calendars.window('week', datetime.utcnow().date())
+    return {
+        'staff bookings': (lambda: history_page(staff), {
+            'booking': 'ix_booking_staff_id_start_time',
+            'booking_archive': 'ix_booking_archive_staff_id_start_time'}),
+        'customer bookings': (lambda: history_page(customer), {
+            'booking': 'ix_booking_user_id_start_time',
+            'booking_archive': 'ix_booking_archive_user_id_start_time'}),
+        'admin bookings': (lambda: history_page(admin), {
+            'booking': 'ix_booking_start_time',
+            'booking_archive': 'ix_booking_archive_start_time'}),
+        'reminder sweep': (lambda: sweep_reminders(), {'booking': 'ix_booking_status_start_time'}),
+        'calendar range': (lambda: calendars.feed(start, end, admin), {'booking': 'ix_booking_start_time'}),
+        'staff calendar range': (lambda: calendars.feed(start, end, staff),
+                                 {'booking': 'ix_booking_staff_id_start_time'}),
+        'customer calendar range': (lambda: calendars.feed(start, end, customer),
+                                    {'booking': 'ix_booking_user_id_start_time'}),
+    }
+
+
+def captured(db, run):
+    """The SELECT statements (with parameters) ``run`` sends to the database."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+
+def explain(db, statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def uses(plan, table, index):
+    """Whether every read of ``table`` in ``plan`` goes through ``index`` (None if not read)."""
+    reads = [line for line in plan if re.match(rf'(SCAN|SEARCH) {table}\b', line)]
+    if not reads:
+        return None
+    return all(f'INDEX {index}' in line for line in reads)
+
+
+def main():
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'explain.sqlite')
+    os.environ['OUTBOX_WORKERS'] = '0'
+    from app import create_app
+    from bootstrap import bootstrap
+    from extensions import db
+
+    app = create_app()
+    bootstrap(app)
+    failures = 0
+    with app.test_request_context():
+        for name, (run, indexes) in hot_queries().items():
+            checked = 0
+            for statement, parameters in captured(db, run):
+                plan = explain(db, statement, parameters)
+                for table, index in indexes.items():
+                    ok = uses(plan, table, index)
+                    if ok is None:
+                        continue
+                    checked += 1
+                    failures += not ok
+                    print(f"{'ok  ' if ok else 'FAIL'} {name} ({table}): {' | '.join(plan)}")
+            if not checked:
+                failures += 1
+                print(f'FAIL {name}: no booking query captured')
+            db.session.rollback()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
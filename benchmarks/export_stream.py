@@ -0,0 +1,87 @@
+"""
+Streaming booking export benchmark.
+
+Seeds N bookings, downloads ``/admin/bookings/export`` through the test
+client and reports rows/sec, bytes and peak Python memory (tracemalloc)
+while the response is consumed. ``--materialise`` instead loads every
+booking as an ORM object with its relationships, as the admin branch of
+``list_bookings`` used to, for comparison.
+
+    python benchmarks/export_stream.py --bookings 200000 --format ndjson
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bookings', type=int, default=200000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--materialise', action='store_true', help='baseline: load all Booking objects')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'export.sqlite'),
+        'OUTBOX_WORKERS': '0',
+    })
+    from sqlalchemy import insert
+    from app import create_app
+    from bootstrap import bootstrap
+    from extensions import db
+    from models import Booking, Service, User
+
+    app = create_app()
+    bootstrap(app)
+    with app.app_context():
+        service = Service(name='Export', description='benchmark', price=10, duration_minutes=30)
+        db.session.add(service)
+        db.session.commit()
+        admin = User.query.filter_by(role='admin').first()
+        base = datetime(2030, 1, 1)
+        for offset in range(0, args.bookings, 10000):
+            db.session.execute(insert(Booking), [
+                {'user_id': admin.id, 'service_id': service.id,
+                 'start_time': base + timedelta(minutes=30 * i), 'end_time': base + timedelta(minutes=30 * i + 30)}
+                for i in range(offset, min(offset + 10000, args.bookings))
+            ])
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if args.materialise:
+        with app.app_context():
+            rows = Booking.query.all()
+            size = sum(len(f'{b.id},{b.service.name},{b.customer.email}') for b in rows)
+            count = len(rows)
+        mode = 'materialised ORM'
+    else:
+        response = client.get(f'/admin/bookings/export?format={args.format}', buffered=False)
+        size = count = 0
+        for chunk in response.response:
+            size += len(chunk)
+            count += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        response.close()
+        if args.format == 'csv':
+            count -= 1  # header
+        mode = f'streamed {args.format}'
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{mode}: {count} rows, {size / 1e6:.1f} MB in {elapsed:.2f}s '
+          f'({count / elapsed:.0f} rows/s), peak memory {peak / 1e6:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
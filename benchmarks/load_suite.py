@@ -0,0 +1,280 @@
+"""
+End-to-end load test of the monolith and the microservices.
+
+Generates a dataset (see ``datagen.py``), starts the monolith and the auth,
+catalog and booking services as real HTTP servers in their own processes and
+drives each scenario with a pool of client threads for a fixed time. Every
+scenario records requests, errors, requests/sec and latency percentiles; the
+results are written as JSON so runs can be compared across commits:
+
+    python benchmarks/load_suite.py --output before.json
+    python benchmarks/load_suite.py --compare before.json --output after.json
+
+``--compare`` exits non-zero when a scenario's throughput drops or its p99
+latency grows by more than ``--tolerance``.
+"""
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+
+def serve_monolith(db_path, sizes, ports):
+    os.environ.update({'DATABASE_URL': f'sqlite:///{db_path}', 'OUTBOX_WORKERS': '0'})
+    from werkzeug.serving import make_server
+    from app import create_app
+    from bootstrap import bootstrap
+    from datagen import generate
+
+    app = create_app()
+    bootstrap(app)
+    with app.app_context():
+        generate(sizes['users'], sizes['staff'], sizes['services'], sizes['past_days'], sizes['future_days'])
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    ports.put(('monolith', server.port))
+    server.serve_forever()
+
+
+def serve_service(name, db_path, sizes, env, ports):
+    os.environ.update(env, DATABASE_URL=f'sqlite:///{db_path}')
+    from werkzeug.serving import make_server
+    from booking_service_latency import load_service
+    from datagen import booking_rows, bulk_insert, service_rows, user_rows
+    from stub_services import notification_stub
+
+    if name == 'booking-service':
+        os.environ['NOTIFICATION_SERVICE_URL'] = notification_stub().start().url
+    module = load_service(name)
+    rnd = random.Random(1)
+    with module.app.app_context():
+        if name == 'booking-service':
+            from flask_migrate import upgrade
+            upgrade()
+            services = [(i + 1, rnd.choice([30, 60])) for i in range(sizes['services'])]
+            first_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            bulk_insert(module.db.session, module.Booking, booking_rows(
+                list(range(1, sizes['staff'] + 1)), list(range(1, sizes['users'] + 1)), services,
+                first_day - timedelta(days=sizes['past_days']), sizes['past_days'] + sizes['future_days'], rnd))
+        else:
+            module.db.create_all()
+            if name == 'service-catalog':
+                import search
+                with module.db.engine.begin() as conn:
+                    search.create_index(conn)
+            if name == 'auth-service':
+                bulk_insert(module.db.session, module.User, user_rows(sizes['users'], 'customer', 'x', phone=False))
+            else:
+                bulk_insert(module.db.session, module.Service, service_rows(sizes['services'], [], rnd))
+    server = make_server('127.0.0.1', 0, module.app, threaded=True)
+    ports.put((name, server.port))
+    server.serve_forever()
+
+
+def future_slot(rnd):
+    day = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=rnd.randint(1, 60))
+    return day + timedelta(minutes=15 * rnd.randrange(32))
+
+
+def scenarios(urls, sizes):
+    """name -> (login(rnd) -> (email, password) or None, request(session, rnd) -> response)."""
+    site = urls['monolith']
+    customer = lambda rnd: (f'customer{rnd.randrange(sizes["users"])}@example.com', 'password')
+    staff = lambda rnd: (f'staff{rnd.randrange(sizes["staff"])}@example.com', 'password')
+    admin = lambda rnd: ('admin@example.com', 'admin123')
+
+    def create_booking(session, rnd):
+        return session.post(f'{site}/bookings/create/{rnd.randint(1, sizes["services"])}',
+                            data={'start_time': future_slot(rnd).strftime('%Y-%m-%dT%H:%M'), 'staff_id': ''},
+                            allow_redirects=False)
+
+    # the services check tokens; an admin may book for and look up any user
+    from stub_services import access_token
+    service_auth = {'Authorization': f'Bearer {access_token(1, "admin")}'}
+
+    def service_booking(session, rnd):
+        start = future_slot(rnd) + timedelta(days=365)
+        return session.post(f'{urls["booking-service"]}/bookings', headers=service_auth, json={
+            'user_id': rnd.randint(1, sizes['users']), 'service_id': rnd.randint(1, sizes['services']),
+            'staff_id': rnd.randint(1, sizes['staff']), 'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=30)).isoformat(),
+        })
+
+    return {
+        'login': (None, lambda s, rnd: s.post(f'{site}/login', data=dict(zip(('email', 'password'), customer(rnd))),
+                                              allow_redirects=False)),
+        'list_services': (None, lambda s, rnd: s.get(f'{site}/services/')),
+        'search_services': (None, lambda s, rnd: s.get(f'{site}/services/?q=synthetic+{rnd.randrange(sizes["services"])}')),
+        'list_bookings:customer': (customer, lambda s, rnd: s.get(f'{site}/bookings/')),
+        'list_bookings:staff': (staff, lambda s, rnd: s.get(f'{site}/bookings/')),
+        'list_bookings:admin': (admin, lambda s, rnd: s.get(f'{site}/bookings/')),
+        'calendar': (admin, lambda s, rnd: s.get(f'{site}/bookings/calendar')),
+        'create_booking': (customer, create_booking),
+        'auth:get_user': (None, lambda s, rnd: s.get(f'{urls["auth-service"]}/users/{rnd.randint(1, sizes["users"])}',
+                                                     headers=service_auth)),
+        'catalog:list_services': (None, lambda s, rnd: s.get(f'{urls["service-catalog"]}/services?limit=50')),
+        'catalog:search': (None, lambda s, rnd: s.get(
+            f'{urls["service-catalog"]}/services?q=service+{rnd.randrange(sizes["services"])}&max_price=100')),
+        'booking:get_booking': (None, lambda s, rnd: s.get(
+            f'{urls["booking-service"]}/bookings/{rnd.randint(1, sizes["bookings_hint"])}', headers=service_auth)),
+        'booking:create': (None, service_booking),
+    }
+
+
+def drive(site, login, request, concurrency, seconds):
+    import requests
+
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(seed):
+        rnd = random.Random(seed)
+        session = requests.Session()
+        if login:
+            email, password = login(rnd)
+            session.post(f'{site}/login', data={'email': email, 'password': password}, allow_redirects=False)
+        samples, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = request(session, rnd).status_code
+                # 409: the slot was taken, a valid outcome for booking scenarios
+                ok = status < 400 or status == 409
+            except requests.RequestException:
+                ok = False
+            samples.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(samples)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    ordered = sorted(latencies) or [0]
+    pick = lambda pct: round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': pick(50),
+        'p90_ms': pick(90),
+        'p99_ms': pick(99),
+        'max_ms': round(1000 * ordered[-1], 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print per-scenario deltas; returns the names of regressed scenarios."""
+    regressed = []
+    for name, now in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        rps_change = now['rps'] / before['rps'] - 1 if before['rps'] else 0
+        p99_change = now['p99_ms'] / before['p99_ms'] - 1 if before['p99_ms'] else 0
+        bad = rps_change < -tolerance or p99_change > tolerance
+        print(f'{"REGRESSED" if bad else "ok":>9}  {name:<24} rps {rps_change:+.0%}  p99 {p99_change:+.0%}')
+        if bad:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--services', type=int, default=30)
+    parser.add_argument('--past-days', type=int, default=90)
+    parser.add_argument('--future-days', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10, help='duration of each scenario')
+    parser.add_argument('--only', action='append', help='glob of scenarios to run (repeatable)')
+    parser.add_argument('--output', default='load_results.json')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = {'users': args.users, 'staff': args.staff, 'services': args.services,
+             'past_days': args.past_days, 'future_days': args.future_days,
+             # roughly the generated booking count, used to pick existing ids
+             'bookings_hint': max(1, args.staff * args.past_days * 5)}
+    tmp = tempfile.mkdtemp()
+    ctx = multiprocessing.get_context('spawn')
+    ports = ctx.Queue()
+    procs = [ctx.Process(target=serve_monolith, args=(os.path.join(tmp, 'monolith.sqlite'), sizes, ports), daemon=True)]
+    for name in ('auth-service', 'service-catalog'):
+        procs.append(ctx.Process(target=serve_service, args=(name, os.path.join(tmp, f'{name}.sqlite'), sizes, {}, ports),
+                                 daemon=True))
+    for p in procs:
+        p.start()
+    urls = {}
+    for _ in procs:
+        name, port = ports.get(timeout=600)
+        urls[name] = f'http://127.0.0.1:{port}'
+    booking = ctx.Process(target=serve_service, daemon=True, args=(
+        'booking-service', os.path.join(tmp, 'booking-service.sqlite'), sizes,
+        {'SERVICE_CATALOG_URL': urls['service-catalog'], 'AUTH_SERVICE_URL': urls['auth-service']}, ports))
+    booking.start()
+    name, port = ports.get(timeout=600)
+    urls[name] = f'http://127.0.0.1:{port}'
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    results = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'concurrency': args.concurrency,
+            'seconds': args.seconds,
+            'dataset': sizes,
+        },
+        'scenarios': {},
+    }
+    for name, (login, request) in scenarios(urls, sizes).items():
+        if args.only and not any(fnmatch.fnmatch(name, pattern) for pattern in args.only):
+            continue
+        stats = drive(urls['monolith'], login, request, args.concurrency, args.seconds)
+        results['scenarios'][name] = stats
+        print(f'{name:<24} {stats["rps"]:8.1f} req/s  p50 {stats["p50_ms"]:7.1f} ms  '
+              f'p99 {stats["p99_ms"]:7.1f} ms  errors {stats["errors"]}')
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}')
+
+    for p in procs + [booking]:
+        p.terminate()
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Login flood benchmark.
+
+Runs concurrent login loops against POST /login while other threads keep
+requesting a cheap page (GET /services/), then reports logins/sec, logins
+turned away by admission control and latency percentiles of the non-login
+requests. Compare ``--inline`` (hash on the request thread, the old
+behaviour) with the default bounded hashing pool.
+
+    python benchmarks/login_flood.py --login-threads 16 --seconds 10
+    python benchmarks/login_flood.py --login-threads 16 --seconds 10 --inline
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--page-threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=29000, help='PBKDF2 rounds')
+    parser.add_argument('--inline', action='store_true', help='hash on the request thread')
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'login.sqlite'),
+        'OUTBOX_WORKERS': '0',
+        'PASSWORD_HASH_ROUNDS': str(args.rounds),
+        'PASSWORD_HASH_WORKERS': '0' if args.inline else os.getenv('PASSWORD_HASH_WORKERS', '2'),
+    })
+    from app import create_app
+    from bootstrap import bootstrap
+
+    app = create_app()
+    bootstrap(app)
+    stop = threading.Event()
+    counts = {'ok': 0, 'busy': 0, 'failed': 0}
+    page_latencies = []
+    lock = threading.Lock()
+
+    def login_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post('/login', data={'email': 'admin@example.com', 'password': 'admin123'})
+            key = 'ok' if response.status_code == 302 else 'busy' if response.status_code == 503 else 'failed'
+            with lock:
+                counts[key] += 1
+
+    def page_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/services/')
+            elapsed = time.perf_counter() - started
+            with lock:
+                page_latencies.append(elapsed)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(args.login_threads)]
+    threads += [threading.Thread(target=page_loop) for _ in range(args.page_threads)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    mode = 'inline hashing' if args.inline else f"hash pool ({os.environ['PASSWORD_HASH_WORKERS']} workers)"
+    print(f'{mode}, {args.login_threads} login threads, {args.seconds:.0f}s')
+    print(f"logins ok={counts['ok']} ({counts['ok'] / args.seconds:.1f}/s) "
+          f"busy={counts['busy']} failed={counts['failed']}")
+    print(f'GET /services/ n={len(page_latencies)} '
+          f'p50={1000 * percentile(page_latencies, 50):.1f}ms p99={1000 * percentile(page_latencies, 99):.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Outbox drain benchmark against a local SMTP stand-in.
+
+Queues N messages in the outbox, starts the worker pool and reports how long
+the queue takes to drain, messages/sec, SMTP connections used and the
+dispatcher's latency counters. Compare with ``--per-message`` which opens a
+new SMTP connection per message, as the old synchronous ``mail.send`` did.
+
+    python benchmarks/outbox_drain.py --messages 2000 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_sink import SMTPSink  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.0, help='simulated relay latency per message (s)')
+    parser.add_argument('--per-message', action='store_true', help='baseline: one connection per mail.send()')
+    args = parser.parse_args()
+
+    sink = SMTPSink(delay=args.delay).start()
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'outbox.sqlite'),
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(sink.port),
+        'OUTBOX_WORKERS': '0',
+        'OUTBOX_POLL_SECONDS': '0.05',
+        'OUTBOX_BATCH_SIZE': str(args.batch_size),
+    })
+    from flask_mail import Message
+    from app import create_app
+    from bootstrap import bootstrap
+    from extensions import db, mail
+    from outbox import enqueue_mail, outbox
+
+    app = create_app()
+    bootstrap(app)
+    with app.app_context():
+        for i in range(args.messages):
+            enqueue_mail(f'user{i}@example.com', 'Benchmark', f'message {i}')
+        db.session.commit()
+
+    started = time.perf_counter()
+    if args.per_message:
+        with app.app_context():
+            for i in range(args.messages):
+                mail.send(Message(subject='Benchmark', recipients=[f'user{i}@example.com'], body=f'message {i}'))
+    else:
+        outbox.start(app, args.workers)
+        while sink.messages < args.messages:
+            time.sleep(0.01)
+        outbox.stop()
+    elapsed = time.perf_counter() - started
+
+    mode = 'per-message send' if args.per_message else f'{args.workers} outbox workers'
+    print(f'{mode}: {sink.messages} messages in {elapsed:.2f}s ({sink.messages / elapsed:.0f} msg/s), '
+          f'{sink.connections} SMTP connections')
+    if not args.per_message:
+        with app.app_context():
+            print(outbox.stats())
+    sink.stop()
+
+
+if __name__ == '__main__':
+    main()
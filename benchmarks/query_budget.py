@@ -0,0 +1,96 @@
+"""
+Per-request query budget for the booking and admin views.
+
+Seeds a few hundred bookings, requests each view as the relevant role and
+counts the SQL statements issued. Exits non-zero if a view exceeds its
+budget, which is what an N+1 regression (lazy loads per row) looks like.
+
+    python benchmarks/query_budget.py --bookings 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Statements allowed per request, independent of the number of rows rendered
+BUDGETS = {
+    ('admin', '/bookings/'): 4,
+    # archive check, occupancy GROUP BY, the week's bookings and the staff filter options
+    ('admin', '/bookings/calendar'): 5,
+    ('admin', '/bookings/calendar?view=month'): 4,
+    ('staff', '/bookings/calendar'): 5,
+    ('customer', '/bookings/calendar'): 6,
+    ('customer', '/bookings/calendar.json?from=2000-01-01&to=2000-02-01'): 4,
+    # two paginated lists plus three rollup aggregates
+    ('admin', '/admin/dashboard'): 5,
+    ('staff', '/bookings/'): 4,
+    ('customer', '/bookings/'): 4,
+}
+
+
+def seed(db, count):
+    from models import User, Service, Booking, Role
+
+    users = {}
+    for role in (Role.STAFF, Role.CUSTOMER):
+        for i in range(5):
+            user = User(email=f'{role}{i}@example.com', name=f'{role} {i}', role=role)
+            user.set_password('secret')
+            db.session.add(user)
+            users.setdefault(role, []).append(user)
+    services = [Service(name=f'Service {i}', price=10.0 + i, duration_minutes=30) for i in range(10)]
+    db.session.add_all(services)
+    db.session.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    for i in range(count):
+        db.session.add(Booking(
+            user_id=users[Role.CUSTOMER][i % 5].id,
+            staff_id=users[Role.STAFF][i % 5].id,
+            service_id=services[i % 10].id,
+            start_time=start + timedelta(minutes=30 * i),
+            end_time=start + timedelta(minutes=30 * i + 30),
+        ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bookings', type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'budget.sqlite')
+    os.environ['OUTBOX_WORKERS'] = '0'
+    from sqlalchemy import event
+    from app import create_app
+    from bootstrap import bootstrap
+    from extensions import db
+
+    app = create_app()
+    bootstrap(app)
+    statements = []
+    with app.app_context():
+        seed(db, args.bookings)
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *a, **kw: statements.append(a[2]))
+
+    logins = {'admin': 'admin@example.com', 'staff': 'staff0@example.com', 'customer': 'customer0@example.com'}
+    passwords = {'admin': 'admin123'}
+    failures = 0
+    for (role, path), budget in BUDGETS.items():
+        client = app.test_client()
+        client.post('/login', data={'email': logins[role], 'password': passwords.get(role, 'secret')})
+        del statements[:]
+        response = client.get(path)
+        used = len(statements)
+        ok = response.status_code == 200 and used <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {role:8} {path:20} {used:4} queries (budget {budget}, HTTP {response.status_code})")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
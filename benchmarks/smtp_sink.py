@@ -0,0 +1,64 @@
+"""
+Minimal in-process SMTP server that accepts and counts messages.
+
+Stand-in for a real mail relay in the outbox and notification benchmarks;
+speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET,
+NOOP, QUIT) and can add a fixed per-message delay to mimic a slow relay.
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        sink = self.server.sink
+        sink.connections += 1
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command.startswith(('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                if sink.delay:
+                    time.sleep(sink.delay)
+                with sink.lock:
+                    sink.messages += 1
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+class SMTPSink:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
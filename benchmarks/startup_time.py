@@ -0,0 +1,72 @@
+"""
+Cold-start benchmark for ``create_app()``.
+
+Each run is a fresh interpreter that imports ``app`` and calls
+``create_app()``, the way a gunicorn worker or a test fixture does. Reports
+the median import and create times, and fails if create_app() runs any SQL,
+starts threads or the scheduler, or if the median cold start exceeds the
+budget.
+
+    python benchmarks/startup_time.py --runs 10 --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = """
+import json, threading, time
+t0 = time.perf_counter()
+import app as app_module
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+t1 = time.perf_counter()
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *a, **k: statements.append(a[2]))
+threads = threading.active_count()
+app = app_module.create_app()
+t2 = time.perf_counter()
+from extensions import scheduler
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_ms': (t2 - t1) * 1000,
+    'statements': len(statements),
+    'threads_started': threading.active_count() - threads,
+    'scheduler_running': scheduler.running,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=1000, help='median import + create budget')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.sqlite'))
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(s['import_ms'] for s in samples)
+    create_ms = statistics.median(s['create_ms'] for s in samples)
+    side_effects = [s for s in samples if s['statements'] or s['threads_started'] or s['scheduler_running']]
+    print(f'{args.runs} cold starts: import {import_ms:.0f} ms, create_app {create_ms:.0f} ms '
+          f'(median, budget {args.budget_ms:.0f} ms total)')
+    if side_effects:
+        print('create_app() has side effects:', side_effects[0])
+    over = import_ms + create_ms > args.budget_ms
+    if over:
+        print('over budget')
+    sys.exit(1 if side_effects or over else 0)
+
+
+if __name__ == '__main__':
+    main()
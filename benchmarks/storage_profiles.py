@@ -0,0 +1,105 @@
+"""
+Concurrent read/write throughput for each SQLite storage profile.
+
+For every profile in ``storage.SQLITE_PROFILES`` a fresh database is created
+and writer processes reserve bookings (one transaction each) while reader
+processes page through the booking list, for a fixed time. Prints writes/sec,
+reads/sec and how many operations failed with "database is locked".
+
+    python benchmarks/storage_profiles.py --writers 4 --readers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def make_app(db_path, profile):
+    os.environ.update({'DATABASE_URL': f'sqlite:///{db_path}', 'SQLITE_PROFILE': profile, 'OUTBOX_WORKERS': '0'})
+    from app import create_app
+    return create_app()
+
+
+def prepare(db_path, profile):
+    from bootstrap import bootstrap
+    bootstrap(make_app(db_path, profile))
+
+
+def worker(role, db_path, profile, seconds, seed, results):
+    from sqlalchemy.exc import OperationalError
+    from extensions import db
+    from models import Booking
+    from reservations import reserve_booking
+
+    app = make_app(db_path, profile)
+    done = locked = 0
+    try:
+        with app.app_context():
+            deadline = time.monotonic() + seconds
+            i = 0
+            while time.monotonic() < deadline:
+                i += 1
+                try:
+                    if role == 'writer':
+                        start = datetime(2030, 1, 1) + timedelta(minutes=30 * (seed * 1000000 + i))
+                        reserve_booking(user_id=1, service_id=1, staff_id=None,
+                                        start_time=start, end_time=start + timedelta(minutes=30))
+                    else:
+                        Booking.query.order_by(Booking.start_time.desc()).limit(50).all()
+                        db.session.rollback()
+                    done += 1
+                except OperationalError:
+                    db.session.rollback()
+                    locked += 1
+    finally:
+        results.put((role, done, locked))
+
+
+def run(profile, args):
+    db_path = os.path.join(tempfile.mkdtemp(), f'{profile}.sqlite')
+    ctx = multiprocessing.get_context('spawn')
+    # create the schema (and seed data) once before the workers start
+    setup = ctx.Process(target=prepare, args=(db_path, profile))
+    setup.start()
+    setup.join()
+
+    results = ctx.Queue()
+    roles = ['writer'] * args.writers + ['reader'] * args.readers
+    procs = [ctx.Process(target=worker, args=(role, db_path, profile, args.seconds, n, results))
+             for n, role in enumerate(roles)]
+    for p in procs:
+        p.start()
+    totals = {'writer': [0, 0], 'reader': [0, 0]}
+    for _ in procs:
+        role, done, locked = results.get()
+        totals[role][0] += done
+        totals[role][1] += locked
+    for p in procs:
+        p.join()
+    print(f"{profile:>8}: {totals['writer'][0] / args.seconds:8.1f} writes/s "
+          f"{totals['reader'][0] / args.seconds:8.1f} reads/s "
+          f"locked errors: {totals['writer'][1] + totals['reader'][1]}")
+
+
+def main():
+    from storage import SQLITE_PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profile', action='append', choices=sorted(SQLITE_PROFILES),
+                        help='profile(s) to run (default: all)')
+    args = parser.parse_args()
+    for profile in args.profile or sorted(SQLITE_PROFILES):
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Local stand-ins for the peer microservices used by the service benchmarks.
+
+Each stub is a threaded HTTP server answering the endpoints the booking and
+notification services call, with an optional fixed response delay to mimic
+network and processing latency. ``access_token`` signs a token the way the
+auth service does, for calling services that require one.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pooled clients can reuse connections
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if stub.delay:
+            time.sleep(stub.delay)
+        with stub.lock:
+            stub.requests += 1
+        for pattern, handler in stub.routes.get(method, []):
+            match = re.fullmatch(pattern, self.path.split('?')[0])
+            if match:
+                status, payload = handler(self.path, *match.groups())
+                return self._respond(status, payload)
+        self._respond(404, {'error': 'not found'})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+
+class StubService:
+    def __init__(self, routes, delay=0.0):
+        """``routes`` maps a method to ``[(path_regex, handler(path, *groups) -> (status, json))]``."""
+        self.routes = routes
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def catalog_stub(delay=0.0):
+    return StubService({'GET': [
+        (r'/services/(\d+)', lambda path, sid: (200, {'id': int(sid), 'name': f'Service {sid}',
+                                                      'price': 10.0, 'duration_minutes': 30})),
+    ]}, delay=delay)
+
+
+def notification_stub(delay=0.0):
+    return StubService({'POST': [
+        (r'/notifications(?:/batch)?', lambda path: (200, {'status': 'notification sent'})),
+    ]}, delay=delay)
+
+
+def auth_stub(delay=0.0):
+    """Answers the revocation poll of ``token_auth.TokenVerifier`` with no revocations."""
+    return StubService({'GET': [
+        (r'/auth/revocations', lambda path: (200, {'revoked': [], 'cursor': 0, 'more': False})),
+    ]}, delay=delay)
+
+
+def access_token(user_id, role='customer', lifetime=3600):
+    """An access token for ``user_id`` signed with the configured HMAC key (needs the repo root on sys.path)."""
+    import jwt
+    from token_auth import ISSUER, hmac_keys
+
+    kid, secret = next(iter(hmac_keys().items()))
+    now = int(time.time())
+    claims = {'sub': str(user_id), 'id': user_id, 'email': f'{role}{user_id}@example.com',
+              'name': f'{role.title()} {user_id}', 'role': role, 'type': 'access', 'fresh': False,
+              'jti': str(uuid.uuid4()), 'iat': now, 'nbf': now, 'exp': now + lifetime, 'iss': ISSUER}
+    return jwt.encode(claims, secret, algorithm='HS256', headers={'kid': kid})
@@ -1,34 +1,120 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort
 from flask_login import login_required, current_user
-from app import db, mail, scheduler
-from models import Booking, Service, User
-from datetime import datetime, timedelta
-from flask_mail import Message
+from app import db
+from models import ArchivedBooking, Booking, Role, Service, User
+from availability import availability_index
+from reservations import reserve_booking, reserve_bookings
+from pagination import next_page_url
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from outbox import enqueue_mail
+from replicas import replica_read
+import archive
+import calendars
+import rollups
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
 
 bookings_bp = Blueprint('bookings', __name__, template_folder='templates')
 
+# Recurrence rules offered on the booking form
+REPEAT_STEPS = {'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+MAX_OCCURRENCES = 52
+MAX_BATCH_ITEMS = 500
+
+
+def with_display_columns(query, model=Booking):
+    """Eager-load only the service/customer/staff columns the booking templates render."""
+    return query.options(
+        joinedload(model.service).load_only(Service.name, Service.price),
+        joinedload(model.customer).load_only(User.name, User.email, User.phone),
+        joinedload(model.staff).load_only(User.name),
+    )
+
+
+def history_page(user):
+    """One page of ``user``'s bookings, newest first: the hot table and the archive, merged by start time."""
+    def visible(model):
+        # Admins see all bookings, staff the ones assigned to them, customers their own
+        return calendars.scoped(with_display_columns(model.query, model), user, model=model)
+
+    return archive.merged_page(visible(Booking), visible(ArchivedBooking), descending=True)
+
 
 @bookings_bp.route('/')
+@replica_read
 @login_required
 def list_bookings():
-    if current_user.role == 'admin':
-        # Admins see all bookings
-        bookings = Booking.query.order_by(Booking.start_time.desc()).all()
-    elif current_user.role == 'staff':
-        # Staff sees bookings assigned to them
-        bookings = Booking.query.filter_by(staff_id=current_user.id).order_by(Booking.start_time.desc()).all()
-    else:
-        # Customers see their own bookings
-        bookings = Booking.query.filter_by(user_id=current_user.id).order_by(Booking.start_time.desc()).all()
-    
-    return render_template('bookings/list.html', bookings=bookings)
+    bookings, next_cursor = history_page(current_user)
+
+    return render_template('bookings/list.html', bookings=bookings, next_url=next_page_url(next_cursor))
 
 @bookings_bp.route('/calendar')
+@replica_read
 @login_required
 def calendar():
-    # very simple list
-    upcoming = Booking.query.filter(Booking.start_time >= datetime.utcnow()).order_by(Booking.start_time).all()
-    return render_template('bookings/calendar.html', bookings=upcoming)
+    # Week (bookings per day) or month (occupancy per day) around ?date=, optionally for one ?staff_id=
+    view = request.args.get('view', 'week')
+    try:
+        anchor = date.fromisoformat(request.args['date']) if 'date' in request.args else datetime.utcnow().date()
+    except ValueError:
+        abort(400)
+    if view not in calendars.VIEWS:
+        abort(400)
+    staff_id = request.args.get('staff_id', type=int)
+    start, end = calendars.window(view, anchor)
+    models = calendars.sources(start)
+    days = calendars.occupancy(start, end, current_user, staff_id, models)
+    by_day = defaultdict(list)
+    if view == 'week':
+        for event in calendars.events(start, end, current_user, staff_id, models):
+            by_day[event.start_time.date()].append(event)
+    staff = []
+    if current_user.role != Role.STAFF:
+        staff = db.session.query(User.id, User.name).filter(User.role == Role.STAFF).order_by(User.name).all()
+    previous = start - timedelta(days=7) if view == 'week' else (start - timedelta(days=1)).replace(day=1)
+    return render_template('bookings/calendar.html', view=view, days=days, by_day=by_day, staff=staff,
+                           staff_id=staff_id, start=start, end=end, previous=previous.date(), following=end.date())
+
+
+@bookings_bp.route('/calendar.json')
+@replica_read
+@login_required
+def calendar_feed():
+    # Compact feed for client-side calendars: ?from=&to= (ISO dates or datetimes), optional ?staff_id=
+    try:
+        start = datetime.fromisoformat(request.args['from'])
+        end = datetime.fromisoformat(request.args['to'])
+    except (KeyError, ValueError):
+        abort(400)
+    if not start < end <= start + timedelta(days=calendars.MAX_FEED_DAYS):
+        abort(400)
+    return jsonify(calendars.feed(start, end, current_user, request.args.get('staff_id', type=int)))
+
+
+@bookings_bp.route('/availability/<int:service_id>')
+@replica_read
+@login_required
+def availability(service_id):
+    service = Service.query.get_or_404(service_id)
+    try:
+        start = datetime.fromisoformat(request.args['from']) if 'from' in request.args else datetime.utcnow()
+        end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else start + timedelta(days=14)
+        staff_id = request.args.get('staff_id', type=int)
+        limit = min(request.args.get('limit', 10, type=int), 100)
+    except ValueError:
+        abort(400)
+    slots = availability_index.free_slots(service.duration_minutes, start, end, staff_id=staff_id, limit=limit)
+    duration = timedelta(minutes=service.duration_minutes)
+    return jsonify({
+        'service_id': service.id,
+        'duration_minutes': service.duration_minutes,
+        'slots': [
+            {'start_time': s.isoformat(), 'end_time': (s + duration).isoformat(), 'staff_id': sid}
+            for s, sid in slots
+        ],
+    })
 
 
 @bookings_bp.route('/create/<int:service_id>', methods=['GET', 'POST'])
@@ -37,23 +123,42 @@ def create_booking(service_id):
     service = Service.query.get_or_404(service_id)
     if request.method == 'POST':
         start_str = request.form['start_time']
-        staff_id = request.form.get('staff_id')
+        staff_id = request.form.get('staff_id', type=int)
         start_time = datetime.fromisoformat(start_str)
         end_time = start_time + timedelta(minutes=service.duration_minutes)
-        booking = Booking(user_id=current_user.id, service_id=service.id, staff_id=staff_id, start_time=start_time, end_time=end_time)
-        db.session.add(booking)
-        db.session.commit()
-
-        # send confirmation (console)
-        send_booking_email(current_user.email, booking)
-
-        # schedule reminder 1 day before
-        run_date = booking.start_time - timedelta(days=1)
-        job_id = f"remind_{booking.id}"
-        try:
-            scheduler.add_job(func=send_reminder, trigger='date', run_date=run_date, args=[booking.id], id=job_id)
-        except Exception:
-            pass
+        repeat = request.form.get('repeat', 'none')
+        if repeat in REPEAT_STEPS:
+            occurrences = min(max(request.form.get('occurrences', 1, type=int), 1), MAX_OCCURRENCES)
+            items = [
+                {'user_id': current_user.id, 'service_id': service.id, 'staff_id': staff_id,
+                 'start_time': start_time + i * REPEAT_STEPS[repeat],
+                 'end_time': end_time + i * REPEAT_STEPS[repeat]}
+                for i in range(occurrences)
+            ]
+            results = create_many(items)
+            created = sum(1 for r in results if r['status'] == 'booked')
+            flash(f'{created} of {len(items)} bookings created')
+            skipped = [r['start_time'] for r in results if r['status'] != 'booked']
+            if skipped:
+                flash('Not available: ' + ', '.join(skipped))
+            return redirect(url_for('bookings.calendar'))
+        if staff_id:
+            if not availability_index.is_free(staff_id, start_time, end_time):
+                flash('Selected staff member is not available at that time')
+                return redirect(url_for('bookings.create_booking', service_id=service.id))
+        elif availability_index.staff_ids():
+            staff_id = availability_index.pick_staff(start_time, end_time)
+            if staff_id is None:
+                flash('No staff member is available at that time')
+                return redirect(url_for('bookings.create_booking', service_id=service.id))
+        booking = reserve_booking(
+            before_commit=booking_created,
+            user_id=current_user.id, service_id=service.id, staff_id=staff_id, start_time=start_time, end_time=end_time)
+        if booking is None:
+            availability_index.invalidate()
+            flash('That time slot was just taken, please pick another')
+            return redirect(url_for('bookings.create_booking', service_id=service.id))
+        availability_index.book(booking)
 
         flash('Booking created')
         return redirect(url_for('bookings.calendar'))
@@ -61,6 +166,86 @@ def create_booking(service_id):
     return render_template('bookings/create.html', service=service, staff=staff)
 
 
+@bookings_bp.route('/batch', methods=['POST'])
+@login_required
+def create_batch():
+    """Create many bookings at once.
+
+    Body: ``{"items": [{"service_id", "start_time", "staff_id"?, "notes"?, "user_id"?}, ...]}``.
+    Every item is checked in one pass and the accepted ones are inserted in a
+    single transaction; the response reports the outcome of each item in order.
+    Only admins and staff may book on behalf of another ``user_id``.
+    """
+    raw = (request.get_json(silent=True) or {}).get('items')
+    if not isinstance(raw, list) or not raw:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(raw) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'at most {MAX_BATCH_ITEMS} items per batch'}), 400
+
+    # Services, staff members and users named by the batch, one query each
+    services = {s.id: s for s in Service.query.filter(Service.id.in_(_ids(raw, 'service_id')))}
+    staff = {row.id for row in db.session.query(User.id).filter(
+        User.id.in_(_ids(raw, 'staff_id')), User.role == Role.STAFF)}
+    on_behalf = current_user.role in ('admin', 'staff')
+    users = {row.id for row in db.session.query(User.id).filter(User.id.in_(_ids(raw, 'user_id')))} \
+        if on_behalf else set()
+
+    items, positions, results = [], [], [None] * len(raw)
+    for i, item in enumerate(raw):
+        try:
+            # services[None] raises KeyError like an unknown id (True would match id 1)
+            service = services[item['service_id'] if _is_id(item['service_id']) else None]
+            start_time = datetime.fromisoformat(item['start_time'])
+        except (KeyError, TypeError, ValueError):
+            results[i] = {'status': 'invalid', 'error': 'service_id and ISO start_time are required'}
+            continue
+        staff_id = item.get('staff_id')
+        if staff_id is not None and not (_is_id(staff_id) and staff_id in staff):
+            results[i] = {'status': 'invalid', 'error': 'staff_id must be a staff member'}
+            continue
+        user_id = current_user.id
+        if on_behalf and item.get('user_id') is not None:
+            user_id = item['user_id']
+            if not (_is_id(user_id) and user_id in users):
+                results[i] = {'status': 'invalid', 'error': 'user_id must be an existing user'}
+                continue
+        items.append({
+            'user_id': user_id,
+            'service_id': service.id,
+            'staff_id': staff_id,
+            'start_time': start_time,
+            'end_time': start_time + timedelta(minutes=service.duration_minutes),
+            'notes': item.get('notes'),
+        })
+        positions.append(i)
+    for i, result in zip(positions, create_many(items)):
+        results[i] = result
+
+    created = sum(1 for r in results if r['status'] == 'booked')
+    return jsonify({'created': created, 'failed': len(results) - created, 'results': results})
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _ids(items, key):
+    """The integer ``key`` values of the dict ``items``; anything else is left for the per-item check."""
+    return {item[key] for item in items if isinstance(item, dict) and _is_id(item.get(key))}
+
+
+def create_many(items):
+    """Reserve ``items`` in one transaction and keep the availability index in step."""
+    results = reserve_bookings(items)
+    for item, result in zip(items, results):
+        if result['status'] == 'booked':
+            availability_index.book(SimpleNamespace(
+                id=result['booking_id'], staff_id=result['staff_id'],
+                start_time=item['start_time'], end_time=item['end_time'], status='booked'))
+        result['start_time'] = item['start_time'].isoformat()
+    return results
+
+
 @bookings_bp.route('/<int:booking_id>/cancel', methods=['POST'])
 @login_required
 def cancel_booking(booking_id):
@@ -68,26 +253,48 @@ def cancel_booking(booking_id):
     if booking.user_id != current_user.id and current_user.role != 'admin':
         flash('Not allowed')
         return redirect(url_for('bookings.calendar'))
-    booking.status = 'cancelled'
-    db.session.commit()
+    if booking.status != 'booked' or not finish_booking(booking, 'cancelled'):
+        flash('Only active bookings can be cancelled')
+        return redirect(url_for('bookings.calendar'))
     flash('Cancelled')
     return redirect(url_for('bookings.calendar'))
 
 
-def send_booking_email(email, booking):
-    try:
-        msg = Message(subject='Booking confirmation', recipients=[email], body=f'Your booking #{booking.id} is confirmed for {booking.start_time}')
-        mail.send(msg)
-    except Exception as e:
-        print('Mail send error', e)
+@bookings_bp.route('/<int:booking_id>/complete', methods=['POST'])
+@login_required
+def complete_booking(booking_id):
+    booking = Booking.query.get_or_404(booking_id)
+    if booking.staff_id != current_user.id and current_user.role != 'admin':
+        flash('Not allowed')
+        return redirect(url_for('bookings.list_bookings'))
+    if booking.status != 'booked' or not finish_booking(booking, 'completed'):
+        flash('Only active bookings can be completed')
+        return redirect(url_for('bookings.list_bookings'))
+    flash('Marked as completed')
+    return redirect(url_for('bookings.list_bookings'))
 
 
-def send_reminder(booking_id):
-    booking = Booking.query.get(booking_id)
-    if not booking:
-        return
-    try:
-        msg = Message(subject='Booking reminder', recipients=[booking.user.email], body=f'Reminder for booking #{booking.id} at {booking.start_time}')
-        mail.send(msg)
-    except Exception as e:
-        print('Reminder send error', e)
+def finish_booking(booking, status):
+    """Move an active booking to ``status``; False if a concurrent request already moved it."""
+    # Conditional update, so only one of two racing requests applies the rollup delta
+    moved = db.session.execute(
+        update(Booking).where(Booking.id == booking.id, Booking.status == 'booked').values(status=status)
+    ).rowcount
+    if moved != 1:
+        db.session.rollback()
+        return False
+    rollups.record([booking], status)
+    db.session.commit()
+    availability_index.release(booking)
+    return True
+
+
+def booking_created(booking):
+    # Runs inside the reservation transaction
+    send_booking_email(current_user.email, booking)
+    rollups.record([booking], 'created')
+
+
+def send_booking_email(email, booking):
+    # Queued in the booking's transaction; delivered by the outbox workers
+    enqueue_mail(email, 'Booking confirmation', f'Your booking #{booking.id} is confirmed for {booking.start_time}')
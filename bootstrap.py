@@ -0,0 +1,46 @@
+"""
+One-shot database setup: apply migrations and seed the default data.
+
+Run it once per deployment (``flask bootstrap`` or ``python init_db.py``)
+instead of on every ``create_app()``. Seeding is idempotent: it only adds the
+admin user and the default categories that are missing.
+"""
+from flask_migrate import upgrade
+
+from extensions import db
+
+DEFAULT_CATEGORIES = [
+    ('Haircut', 'Various haircut services'),
+    ('Massage', 'Relaxing massage treatments'),
+    ('Nail Care', 'Manicure and pedicure services'),
+    ('Facial', 'Facial treatments and skincare'),
+]
+
+
+def seed_defaults():
+    """Add the admin user and default categories if missing; returns what was created."""
+    from models import User, Role, ServiceCategory
+
+    created = []
+    if not User.query.filter_by(email='admin@example.com').first():
+        admin = User(email='admin@example.com', name='Admin User', role=Role.ADMIN)
+        admin.set_password('admin123')  # Change this in production!
+        db.session.add(admin)
+        created.append('admin user (admin@example.com)')
+
+    names = [name for name, _ in DEFAULT_CATEGORIES]
+    existing = {c.name for c in ServiceCategory.query.filter(ServiceCategory.name.in_(names))}
+    for name, desc in DEFAULT_CATEGORIES:
+        if name not in existing:
+            db.session.add(ServiceCategory(name=name, description=desc))
+            created.append(f'category: {name}')
+
+    db.session.commit()
+    return created
+
+
+def bootstrap(app):
+    """Migrate the schema to the latest revision and seed defaults."""
+    with app.app_context():
+        upgrade()
+        return seed_defaults()
@@ -0,0 +1,118 @@
+"""
+Week and month booking calendars.
+
+Every read is bounded to the visible window ``[start, end)`` and scoped like
+the booking list: customers see their own bookings, staff the ones assigned
+to them, admins everything, optionally narrowed to one staff member. Per-day
+occupancy is one GROUP BY over the window; the week view and the JSON feed
+also list the window's bookings, selecting only the columns they show.
+Windows that reach back into the archive (see archive.py) read it as well.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased
+
+import archive
+from extensions import db
+from models import ArchivedBooking, Booking, Role, Service, User
+
+VIEWS = ('week', 'month')
+# Longest window the JSON feed accepts
+MAX_FEED_DAYS = 62
+
+
+def window(view, anchor):
+    """``(start, end)`` datetimes of the week (from Monday) or month containing ``anchor``."""
+    if view == 'month':
+        first = anchor.replace(day=1)
+        following = (first + timedelta(days=32)).replace(day=1)
+    else:
+        first = anchor - timedelta(days=anchor.weekday())
+        following = first + timedelta(days=7)
+    return datetime.combine(first, datetime.min.time()), datetime.combine(following, datetime.min.time())
+
+
+def scoped(query, user, staff_id=None, model=Booking):
+    """Restrict ``query`` to the bookings ``user`` may see, and to ``staff_id`` if given."""
+    if user.role == Role.STAFF:
+        query = query.filter(model.staff_id == user.id)
+    elif user.role != Role.ADMIN:
+        query = query.filter(model.user_id == user.id)
+    if staff_id is not None:
+        query = query.filter(model.staff_id == staff_id)
+    return query
+
+
+def sources(start):
+    """Booking tables a window starting at ``start`` has to read."""
+    return (Booking, ArchivedBooking) if archive.reaches(start) else (Booking,)
+
+
+def _day(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def occupancy(start, end, user, staff_id=None, models=None):
+    """One summary per day of ``[start, end)``: bookings, cancelled, booked minutes."""
+    rows = {}
+    for model in models or sources(start):
+        day = func.date(model.start_time)
+        active = model.status != 'cancelled'
+        query = (
+            db.session.query(
+                day,
+                func.sum(case((active, 1), else_=0)),
+                func.sum(case((active, 0), else_=1)),
+                func.sum(case((active, Service.duration_minutes), else_=0)),
+            )
+            .join(Service, Service.id == model.service_id)
+            .filter(model.start_time >= start, model.start_time < end)
+        )
+        for d, n, c, m in scoped(query, user, staff_id, model).group_by(day):
+            totals = rows.get(_day(d), (0, 0, 0))
+            rows[_day(d)] = (totals[0] + n, totals[1] + c, totals[2] + m)
+    days = []
+    current = start.date()
+    while current < end.date():
+        bookings, cancelled, minutes = rows.get(current, (0, 0, 0))
+        days.append({'day': current, 'bookings': bookings, 'cancelled': cancelled, 'booked_minutes': minutes})
+        current += timedelta(days=1)
+    return days
+
+
+def events(start, end, user, staff_id=None, models=None):
+    """Bookings starting in ``[start, end)`` as plain rows, in start order."""
+    found = []
+    for model in models or sources(start):
+        customer = aliased(User)
+        staff = aliased(User)
+        query = (
+            db.session.query(
+                model.id, model.start_time, model.end_time, model.status, model.user_id,
+                model.staff_id, Service.name.label('service'),
+                func.coalesce(customer.name, customer.email).label('customer'),
+                staff.name.label('staff'),
+            )
+            .join(Service, Service.id == model.service_id)
+            .join(customer, customer.id == model.user_id)
+            .outerjoin(staff, staff.id == model.staff_id)
+            .filter(model.start_time >= start, model.start_time < end)
+        )
+        found.extend(scoped(query, user, staff_id, model).order_by(model.start_time, model.id))
+    return sorted(found, key=lambda e: (e.start_time, e.id))
+
+
+def feed(start, end, user, staff_id=None):
+    """Compact JSON-ready calendar for ``[start, end)``."""
+    models = sources(start)
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': [dict(d, day=d['day'].isoformat()) for d in occupancy(start, end, user, staff_id, models)],
+        'events': [
+            {'id': e.id, 'start': e.start_time.isoformat(), 'end': e.end_time.isoformat(), 'status': e.status,
+             'title': e.service, 'customer': e.customer, 'staff_id': e.staff_id, 'staff': e.staff}
+            for e in events(start, end, user, staff_id, models)
+        ],
+    }
@@ -0,0 +1,219 @@
+"""
+Read-through cache for the service catalog.
+
+Catalog reads (service list pages, categories, single services) are served
+from a cache backend and invalidated explicitly by the views that write the
+catalog. Invalidation bumps a per-namespace generation token that is part of
+every cache key, so it is O(1) and also works with a shared backend where
+several processes see the same keys. The generations are timestamps, which
+also makes them the catalog's HTTP validators (see ``services.py``).
+
+The default backend is an in-process LRU with TTL. Set ``CATALOG_CACHE_BACKEND``
+to ``module:Class`` to use a shared backend exposing the same get/set/delete
+interface. The generations live in that shared backend; with the in-process
+backend they are kept in the one-row ``catalog_version`` table instead (one
+primary-key read per request), so that every worker sees a write made by
+another one, both in its cache keys and in its HTTP validators.
+
+Entries loaded shortly after a catalog write are read from the primary, not a
+replica that may not have the write yet (see ``replicas.py``).
+"""
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from flask import current_app, g
+from sqlalchemy import select
+
+import replicas
+from extensions import db
+
+_MISSING = object()
+
+
+class LocalBackend:
+    """Thread-safe LRU with per-entry TTL; stand-in for a shared cache."""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CatalogCache:
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            cfg = current_app.config
+            path = cfg.get('CATALOG_CACHE_BACKEND')
+            if path:
+                module, _, name = path.partition(':')
+                backend_cls = getattr(importlib.import_module(module), name)
+                self._backend = backend_cls()
+            else:
+                self._backend = LocalBackend(
+                    max_entries=cfg.get('CATALOG_CACHE_MAX_ENTRIES', 1024),
+                    ttl=cfg.get('CATALOG_CACHE_TTL', 300),
+                )
+        return self._backend
+
+    @property
+    def shared(self):
+        """True when every worker sees the same backend (a configured shared backend)."""
+        return bool(current_app.config.get('CATALOG_CACHE_BACKEND'))
+
+    def _generation(self, namespace):
+        if not self.shared:
+            return self._stored_generations()[namespace]
+        # A missing (never set or evicted) generation is replaced by a fresh
+        # token rather than a counter reset, so older entries stay unreachable.
+        generation = self.backend.get(('gen', namespace))
+        if generation is None:
+            generation = self.bump(namespace)
+        return generation
+
+    def _stored_generations(self):
+        # read once per request; a missing row (schema made without migrations) reads as 0
+        if 'catalog_version' not in g:
+            from models import CatalogVersion
+            row = db.session.execute(
+                select(CatalogVersion.services, CatalogVersion.categories).where(CatalogVersion.id == 1)).first()
+            g.catalog_version = {'services': row.services, 'categories': row.categories} if row else \
+                {'services': 0, 'categories': 0}
+        return g.catalog_version
+
+    def bump(self, namespace):
+        with self._lock:
+            generation = time.time_ns()
+            if self.shared:
+                self.backend.set(('gen', namespace), generation, ttl=10 ** 9)
+            else:
+                from models import CatalogVersion
+                if not CatalogVersion.query.filter_by(id=1).update({namespace: generation}):
+                    db.session.add(CatalogVersion(id=1, **{'services': 0, 'categories': 0, namespace: generation}))
+                db.session.commit()
+                g.pop('catalog_version', None)
+            return generation
+
+    def version(self):
+        """``(services, categories)`` generations; they change on every catalog write."""
+        return self._generation('services'), self._generation('categories')
+
+    def get_or_load(self, key, loader, changed_at=None):
+        value = self.backend.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        if changed_at is not None and time.time_ns() - changed_at < current_app.config.get('REPLICA_MAX_LAG_SECONDS', 30) * 1e9:
+            # the generation is newer than a replica may lag; don't cache its stale rows
+            replicas.use_primary()
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+        }
+
+    # Catalog reads. Values are plain snapshots, never ORM instances, so they
+    # are safe to share between requests and sessions.
+
+    def services_page(self, params, loader):
+        """One page of the list/search view; ``params`` is a hashable tuple of its arguments."""
+        services, categories = self.version()
+        return self.get_or_load(('services', services, categories, params), loader, max(services, categories))
+
+    def categories(self):
+        from models import ServiceCategory
+
+        def load():
+            rows = db.session.query(ServiceCategory.id, ServiceCategory.name, ServiceCategory.description)
+            return [category_snapshot(r) for r in rows.order_by(ServiceCategory.id)]
+
+        generation = self._generation('categories')
+        return self.get_or_load(('categories', generation), load, generation)
+
+    def service(self, service_id):
+        from models import Service
+
+        def load():
+            service = db.session.get(Service, service_id)
+            return service_snapshot(service) if service is not None else None
+
+        # a new service is only in the services generation
+        services, categories = self.version()
+        return self.get_or_load(('service', service_id, categories), load, max(services, categories))
+
+    # Invalidation hooks for the writing views
+
+    def service_created(self):
+        self.bump('services')
+
+    def service_deleted(self, service_id):
+        self.backend.delete(('service', service_id, self._generation('categories')))
+        self.bump('services')
+
+    def categories_changed(self):
+        self.bump('categories')
+
+
+def category_snapshot(category):
+    return SimpleNamespace(id=category.id, name=category.name, description=category.description)
+
+
+def service_snapshot(service):
+    category = service.category
+    return SimpleNamespace(
+        id=service.id,
+        name=service.name,
+        description=service.description,
+        price=service.price,
+        duration_minutes=service.duration_minutes,
+        category_id=service.category_id,
+        category=category_snapshot(category) if category is not None else None,
+    )
+
+
+catalog_cache = CatalogCache()
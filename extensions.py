@@ -1,10 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from flask_migrate import Migrate
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from replicas import RoutingSession
+
 # Initialize extensions without app context
-db = SQLAlchemy()
+# Sessions read from a replica in views marked @replica_read (see replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 mail = Mail()
+migrate = Migrate()
 scheduler = BackgroundScheduler()
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Conditional GET for cacheable pages and JSON APIs.
+
+A view's validators (an ETag, a Last-Modified time and the Cache-Control
+policy) are computed from data that is already at hand, such as a cache
+generation, before any database or template work. If the client's
+``If-None-Match`` (or, without it, ``If-Modified-Since``) shows its copy is
+current, the view is skipped and an empty 304 is returned.
+"""
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request
+
+
+def timestamp(ns):
+    """Aware UTC datetime for a ``time.time_ns()`` value."""
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc)
+
+
+def is_fresh(etag, last_modified=None):
+    if request.if_none_match:
+        # an ETag comparison takes precedence over dates
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None, cache_control=None, vary=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    if vary:
+        response.vary.add(vary)
+    return response
+
+
+def conditional(validators):
+    """Decorate a GET view with a ``validators(*args, **kwargs)`` function.
+
+    ``validators`` returns a dict of ``set_validators`` keyword arguments
+    (``etag`` required), or None when the response must not be cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            found = validators(*args, **kwargs) if request.method in ('GET', 'HEAD') else None
+            if found is None:
+                return view(*args, **kwargs)
+            if is_fresh(found['etag'], found.get('last_modified')):
+                return set_validators(Response(status=304), **found)
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, **found)
+            return response
+        return wrapper
+    return decorator
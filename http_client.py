@@ -0,0 +1,125 @@
+"""
+HTTP client for calls between the microservices.
+
+One ``ServiceClient`` per peer service keeps a ``requests.Session`` with a
+keep-alive connection pool, applies strict connect/read timeouts to every
+call, retries idempotent GETs on connection errors, optionally caches GET
+responses for a TTL, and can dispatch fire-and-forget POSTs through a
+bounded background queue so the caller does not wait on the peer.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from instrumentation import observe_client_call
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(Exception):
+    """The peer service could not be reached in time."""
+
+
+class ServiceClient:
+    def __init__(self, base_url, connect_timeout=None, read_timeout=None, pool_size=None,
+                 cache_ttl=None, queue_size=1000, dispatch_workers=1):
+        self.base_url = (base_url or '').rstrip('/')
+        self.peer = self.base_url.split('://', 1)[-1] or 'unset'
+        self.timeout = (
+            connect_timeout or float(os.getenv('HTTP_CONNECT_TIMEOUT', 1.0)),
+            read_timeout or float(os.getenv('HTTP_READ_TIMEOUT', 3.0)),
+        )
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv('HTTP_CACHE_TTL', 60))
+        pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', 20))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.05, allowed_methods={'GET'}),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._dispatch_workers = dispatch_workers
+        self._dispatchers = []
+        self.dropped = 0
+
+    def url(self, path):
+        return f'{self.base_url}{path}'
+
+    def get(self, path, cache=False, **kwargs):
+        """GET ``path``; with ``cache=True`` successful responses are reused for the TTL."""
+        if cache:
+            with self._cache_lock:
+                entry = self._cache.get(path)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        response = self._send('GET', path, **kwargs)
+        if cache and response.status_code == 200:
+            with self._cache_lock:
+                if len(self._cache) > 10000:
+                    self._cache.clear()
+                self._cache[path] = (time.monotonic() + self.cache_ttl, response)
+        return response
+
+    def post(self, path, **kwargs):
+        return self._send('POST', path, **kwargs)
+
+    def _send(self, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            observe_client_call(self.peer, method, 'error', time.perf_counter() - started)
+            raise ServiceUnavailable(f'{method} {path}: {e}') from e
+        observe_client_call(self.peer, method, response.status_code, time.perf_counter() - started)
+        return response
+
+    def post_later(self, path, json, attempts=3, headers=None):
+        """Queue a POST for background delivery; returns False if the queue is full."""
+        self._ensure_dispatchers()
+        try:
+            self._queue.put_nowait((path, json, attempts, headers))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning('Dispatch queue full, dropping POST %s', path)
+            return False
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _ensure_dispatchers(self):
+        if self._dispatchers:
+            return
+        with self._cache_lock:
+            if self._dispatchers:
+                return
+            for i in range(self._dispatch_workers):
+                thread = threading.Thread(target=self._dispatch_loop, name=f'http-dispatch-{i}', daemon=True)
+                thread.start()
+                self._dispatchers.append(thread)
+
+    def _dispatch_loop(self):
+        while True:
+            path, json, attempts, headers = self._queue.get()
+            for attempt in range(attempts):
+                try:
+                    response = self.post(path, json=json, headers=headers)
+                    if response.status_code < 500:
+                        break
+                except ServiceUnavailable as e:
+                    logger.warning('Dispatch attempt %d failed: %s', attempt + 1, e)
+                if attempt < attempts - 1:
+                    time.sleep(0.1 * 2 ** attempt)
+            self._queue.task_done()
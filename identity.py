@@ -0,0 +1,75 @@
+"""
+Process-local cache of logged-in user identities.
+
+Flask-Login calls the user loader on every authenticated request; serving it
+from here means steady-state page views issue no user SELECT. Entries are
+small read-only snapshots of the fields views and templates use (id, email,
+name, role, phone), expire after ``IDENTITY_CACHE_TTL`` seconds, and are
+dropped by ``invalidate`` whenever a user row is written. Each invalidation
+bumps the user's version so a load that raced with the write is not cached.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import UserMixin
+
+from extensions import db
+
+
+class CachedUser(UserMixin):
+    """Detached stand-in for ``models.User`` used as ``current_user``."""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.name = user.name
+        self.role = user.role
+        self.phone = user.phone
+
+
+class IdentityCache:
+    def __init__(self):
+        self._data = OrderedDict()   # user_id -> (expires, CachedUser)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            version = self._versions.get(user_id, 0)
+        self.misses += 1
+
+        from models import User
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = CachedUser(user)
+        cfg = current_app.config
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._data[user_id] = (now + cfg.get('IDENTITY_CACHE_TTL', 300), snapshot)
+                self._data.move_to_end(user_id)
+                while len(self._data) > cfg.get('IDENTITY_CACHE_MAX_ENTRIES', 10000):
+                    self._data.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._data)}
+
+
+identity_cache = IdentityCache()
@@ -0,0 +1,214 @@
+"""
+Request metrics, slow-query log and an opt-in sampling profiler.
+
+``init_app(app, service)`` is called by the monolith's ``create_app`` and by
+each ``services/*/app.py``. It records, per process:
+
+* ``http_request_duration_seconds``: a latency histogram per route, method and
+  status. The route label is the URL rule, so ids do not create new series.
+* ``db_queries_per_request`` and ``db_query_duration_seconds``, collected
+  through SQLAlchemy engine events. Each response also carries a
+  ``Server-Timing`` header with the request's query count and time.
+* ``http_client_duration_seconds``: outbound calls made through
+  ``http_client.ServiceClient``, labelled by peer, method and status.
+
+Statements slower than ``SLOW_QUERY_MS`` are logged to the
+``instrumentation.slow_query`` logger with the calling line of application
+code. Everything is exposed in Prometheus text format at ``/metrics``.
+
+Setting ``PROFILE_ENDPOINTS`` (comma-separated endpoint names, or ``*``)
+starts a sampling profiler. Every ``PROFILE_INTERVAL_MS`` it captures the
+stacks of threads that are serving those endpoints. ``/metrics/profile``
+returns the samples as folded stacks, ready for flamegraph tools.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('instrumentation.slow_query')
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in sorted(items):
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in key)
+            sep = ',' if labels else ''
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by route.', LATENCY_BUCKETS)
+request_queries = Histogram('db_queries_per_request', 'SQL statements issued per request.', COUNT_BUCKETS)
+query_duration = Histogram('db_query_duration_seconds', 'SQL statement latency.', LATENCY_BUCKETS)
+client_duration = Histogram('http_client_duration_seconds', 'Outbound inter-service call latency.', LATENCY_BUCKETS)
+METRICS = [request_duration, request_queries, query_duration, client_duration]
+
+_settings = {'service': 'app', 'slow_query_seconds': 0.1}
+
+
+def observe_client_call(peer, method, status, seconds):
+    """Record one outbound HTTP call; ``status`` is the HTTP status or ``'error'``."""
+    client_duration.observe(seconds, service=_settings['service'], peer=peer, method=method, status=status)
+
+
+def _caller():
+    """Innermost frame of application code (not SQLAlchemy, not this module) on the stack."""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(ROOT) and frame.filename != __file__ and 'site-packages' not in frame.filename:
+            return f'{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    query_duration.observe(elapsed, service=_settings['service'])
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_seconds = g.get('db_seconds', 0.0) + elapsed
+    if elapsed >= _settings['slow_query_seconds']:
+        logger.warning('Slow query (%.1f ms) from %s: %s', elapsed * 1000, _caller(), ' '.join(statement.split())[:1000])
+
+
+class Sampler:
+    """Samples the stacks of threads registered with ``track``."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = defaultdict(Counter)   # endpoint -> folded stack -> count
+        self._active = {}                     # thread id -> endpoint
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def track(self, endpoint):
+        self._active[threading.get_ident()] = endpoint
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                    self._thread.start()
+
+    def untrack(self):
+        self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, endpoint in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                    frame = frame.f_back
+                with self._lock:
+                    self.samples[endpoint][';'.join(reversed(stack))] += 1
+
+    def folded(self, endpoint=None):
+        with self._lock:
+            return '\n'.join(
+                f'{stack} {count}'
+                for name, stacks in sorted(self.samples.items()) if endpoint in (None, name)
+                for stack, count in stacks.most_common()
+            )
+
+
+def init_app(app, service):
+    """Instrument ``app`` and add the ``/metrics`` endpoints."""
+    app.config.setdefault('SLOW_QUERY_MS', float(os.getenv('SLOW_QUERY_MS', 100)))
+    app.config.setdefault('PROFILE_ENDPOINTS', os.getenv('PROFILE_ENDPOINTS', ''))
+    app.config.setdefault('PROFILE_INTERVAL_MS', float(os.getenv('PROFILE_INTERVAL_MS', 5)))
+    _settings['service'] = service
+    _settings['slow_query_seconds'] = app.config['SLOW_QUERY_MS'] / 1000
+    profiled = {e.strip() for e in app.config['PROFILE_ENDPOINTS'].split(',') if e.strip()}
+    sampler = Sampler(app.config['PROFILE_INTERVAL_MS'] / 1000) if profiled else None
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        if sampler and ('*' in profiled or request.endpoint in profiled):
+            sampler.track(request.endpoint)
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        queries, db_seconds = g.get('db_queries', 0), g.get('db_seconds', 0.0)
+        request_duration.observe(elapsed, service=service, route=route, method=request.method,
+                                 status=response.status_code)
+        request_queries.observe(queries, service=service, route=route)
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_seconds * 1000:.1f};desc="{queries} queries", app;dur={elapsed * 1000:.1f}'
+        )
+        return response
+
+    if sampler:
+        app.teardown_request(lambda exc: sampler.untrack())
+
+    @app.route('/metrics')
+    def metrics():
+        lines = []
+        for metric in METRICS:
+            lines.extend(metric.expose())
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+    @app.route('/metrics/profile')
+    def profile():
+        if sampler is None:
+            return Response('profiling is off; set PROFILE_ENDPOINTS\n', status=404, mimetype='text/plain')
+        return Response(sampler.folded(request.args.get('endpoint')) + '\n', mimetype='text/plain')
@@ -0,0 +1,49 @@
+"""service search index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def _fts5(bind):
+    if bind.dialect.name != 'sqlite':
+        return False
+    return 'ENABLE_FTS5' in {row[0] for row in bind.exec_driver_sql('PRAGMA compile_options')}
+
+
+def upgrade():
+    # SQLite only: an FTS5 index over service name/description, synced by
+    # triggers (see search.py). Other backends search with LIKE.
+    bind = op.get_bind()
+    if not _fts5(bind):
+        return
+    op.execute("CREATE VIRTUAL TABLE service_fts USING fts5("
+               "name, description, content='service', content_rowid='id', tokenize='porter unicode61')")
+    op.execute("CREATE TRIGGER service_fts_ai AFTER INSERT ON service BEGIN "
+               "INSERT INTO service_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END")
+    op.execute("CREATE TRIGGER service_fts_ad AFTER DELETE ON service BEGIN "
+               "INSERT INTO service_fts(service_fts, rowid, name, description) "
+               "VALUES ('delete', old.id, old.name, old.description); END")
+    op.execute("CREATE TRIGGER service_fts_au AFTER UPDATE ON service BEGIN "
+               "INSERT INTO service_fts(service_fts, rowid, name, description) "
+               "VALUES ('delete', old.id, old.name, old.description); "
+               "INSERT INTO service_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END")
+    op.execute("INSERT INTO service_fts(service_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('service_fts_ai', 'service_fts_ad', 'service_fts_au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS service_fts')
@@ -1,7 +1,7 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime
-from passlib.hash import pbkdf2_sha256 as sha256
+from passwords import password_hasher
 
 
 class Role:
@@ -37,10 +37,14 @@ class User(UserMixin, db.Model):
     )
 
     def set_password(self, password):
-        self.password_hash = sha256.hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return sha256.verify(password, self.password_hash)
+        # Re-hash with the current cost settings when the stored hash is outdated
+        valid, new_hash = password_hasher.verify_and_update(password, self.password_hash)
+        if valid and new_hash:
+            self.password_hash = new_hash
+        return valid
 
 
 class ServiceCategory(db.Model):
@@ -61,6 +65,19 @@ class Service(db.Model):
     bookings = db.relationship('Booking', backref='service', lazy=True)
 
 
+class CatalogVersion(db.Model):
+    """When the services and the categories last changed (``time.time_ns()``); one row.
+
+    Shared by all workers, so the catalog cache keys and HTTP validators agree
+    between processes without a shared cache backend (see catalog_cache.py).
+    """
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    services = db.Column(db.BigInteger, nullable=False, default=0)
+    categories = db.Column(db.BigInteger, nullable=False, default=0)
+
+
 class StaffProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
@@ -71,6 +88,14 @@ class StaffProfile(db.Model):
 
 
 class Booking(db.Model):
+    # Every booking query filters on staff/customer/status and orders or ranges on start_time
+    __table_args__ = (
+        db.Index('ix_booking_staff_id_start_time', 'staff_id', 'start_time'),
+        db.Index('ix_booking_user_id_start_time', 'user_id', 'start_time'),
+        db.Index('ix_booking_status_start_time', 'status', 'start_time'),
+        db.Index('ix_booking_start_time', 'start_time'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
@@ -80,6 +105,9 @@ class Booking(db.Model):
     status = db.Column(db.String(30), default='booked')  # booked, cancelled, completed
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when a reminder sweep claims the booking; see reminders.py
+    reminder_sent_at = db.Column(db.DateTime)
+    reminder_claimed_by = db.Column(db.String(64))
 
     # Relationship to the staff User (if any). Backref 'staff_member' is defined on User.assigned_bookings
     # Relationship to customer who booked
@@ -96,3 +124,72 @@ class Booking(db.Model):
         foreign_keys=[staff_id],
         overlaps="customer,bookings"
     )
+
+
+class ArchivedBooking(db.Model):
+    """Completed and cancelled bookings moved out of ``booking`` by archive.py.
+
+    Rows keep their booking id, so links and cursors stay valid after a move.
+    """
+    __tablename__ = 'booking_archive'
+    __table_args__ = (
+        db.Index('ix_booking_archive_user_id_start_time', 'user_id', 'start_time'),
+        db.Index('ix_booking_archive_staff_id_start_time', 'staff_id', 'start_time'),
+        db.Index('ix_booking_archive_start_time', 'start_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
+    staff_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    service = db.relationship('Service', viewonly=True)
+    customer = db.relationship('User', foreign_keys=[user_id], viewonly=True)
+    staff = db.relationship('User', foreign_keys=[staff_id], viewonly=True)
+
+
+class BookingRollup(db.Model):
+    """Per day x service x staff booking counters, maintained by rollups.py.
+
+    ``staff_id`` is 0 for unassigned bookings so the key has no NULLs.
+    ``revenue`` and ``booked_minutes`` cover bookings that are not cancelled.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('day', 'service_id', 'staff_id', name='uq_booking_rollup_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    service_id = db.Column(db.Integer, nullable=False)
+    staff_id = db.Column(db.Integer, nullable=False, default=0)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    booked_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class OutboxMessage(db.Model):
+    """Email queued in the same transaction as the change that triggered it."""
+    __table_args__ = (
+        db.Index('ix_outbox_message_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
@@ -0,0 +1,153 @@
+"""
+Transactional email outbox.
+
+Views call ``enqueue_mail`` inside the transaction that changes the data the
+email is about, so the message is committed (or rolled back) together with
+it and nothing talks to SMTP on the request path. A pool of worker threads
+claims pending rows in batches, sends each batch over a single SMTP
+connection and reschedules failures with exponential backoff.
+
+Run the pool in-process (``OUTBOX_WORKERS`` > 0) or as a separate process
+with ``flask outbox-worker``.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import func, or_
+
+from extensions import db, mail
+from models import OutboxMessage
+
+
+def enqueue_mail(recipient, subject, body):
+    """Add a message to the current session; it is sent once the caller commits."""
+    message = OutboxMessage(recipient=recipient, subject=subject, body=body)
+    db.session.add(message)
+    return message
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.sent = 0
+        self.failed = 0
+        self.send_seconds = 0.0
+        self.delivery_seconds = 0.0
+
+    def claim(self, batch_size, lease_seconds):
+        """Mark up to ``batch_size`` due messages as ours and return them."""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        due = or_(
+            (OutboxMessage.status == 'pending') & (OutboxMessage.next_attempt_at <= now),
+            # a worker that died mid-batch leaves rows in 'sending'; take them over after the lease
+            (OutboxMessage.status == 'sending') & (OutboxMessage.claimed_at < now - timedelta(seconds=lease_seconds)),
+        )
+        ids = [
+            row.id for row in db.session.query(OutboxMessage.id)
+            .filter(due).order_by(OutboxMessage.id).limit(batch_size)
+        ]
+        if not ids:
+            db.session.rollback()
+            return []
+        OutboxMessage.query.filter(OutboxMessage.id.in_(ids), due).update(
+            {'status': 'sending', 'claimed_by': token, 'claimed_at': now},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        return OutboxMessage.query.filter_by(claimed_by=token, status='sending').all()
+
+    def drain_once(self):
+        """Send one batch; returns the number of messages handled."""
+        cfg = current_app.config
+        batch = self.claim(cfg.get('OUTBOX_BATCH_SIZE', 50), cfg.get('OUTBOX_LEASE_SECONDS', 300))
+        if not batch:
+            return 0
+        try:
+            with mail.connect() as conn:
+                for message in batch:
+                    started = time.perf_counter()
+                    try:
+                        conn.send(Message(subject=message.subject, recipients=[message.recipient],
+                                          body=message.body))
+                    except Exception as e:
+                        self._retry(message, e)
+                        continue
+                    self._sent(message, time.perf_counter() - started)
+        except Exception as e:
+            # could not connect: everything not yet sent goes back with backoff
+            for message in batch:
+                if message.status == 'sending':
+                    self._retry(message, e)
+        db.session.commit()
+        return len(batch)
+
+    def _sent(self, message, seconds):
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        with self._lock:
+            self.sent += 1
+            self.send_seconds += seconds
+            self.delivery_seconds += (message.sent_at - message.created_at).total_seconds()
+
+    def _retry(self, message, error):
+        cfg = current_app.config
+        message.attempts = (message.attempts or 0) + 1
+        message.last_error = str(error)[:1000]
+        if message.attempts >= cfg.get('OUTBOX_MAX_ATTEMPTS', 8):
+            message.status = 'failed'
+            with self._lock:
+                self.failed += 1
+            return
+        delay = cfg.get('OUTBOX_RETRY_BASE_SECONDS', 30) * 2 ** (message.attempts - 1)
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    def stats(self):
+        depth = db.session.query(func.count(OutboxMessage.id)).filter(
+            OutboxMessage.status.in_(('pending', 'sending'))
+        ).scalar()
+        with self._lock:
+            return {
+                'queue_depth': depth,
+                'sent': self.sent,
+                'failed': self.failed,
+                'avg_send_ms': round(1000 * self.send_seconds / self.sent, 2) if self.sent else None,
+                'avg_delivery_seconds': round(self.delivery_seconds / self.sent, 3) if self.sent else None,
+            }
+
+    def _work(self, app):
+        interval = app.config.get('OUTBOX_POLL_SECONDS', 2)
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    handled = self.drain_once()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning('Outbox worker error: %s', e)
+                    handled = 0
+            if not handled:
+                self._stop.wait(interval)
+
+    def start(self, app, workers):
+        self._stop.clear()
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, args=(app,), name=f'outbox-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+outbox = OutboxDispatcher()
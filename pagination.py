@@ -0,0 +1,99 @@
+"""
+Keyset (seek) pagination helpers.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+served, so fetching page N costs the same as page 1: the query seeks past the
+cursor on an index instead of counting an OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request, url_for
+from sqlalchemy import and_, or_
+from sqlalchemy.types import DateTime
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(columns):
+            return None
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for v, col in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        return None
+
+
+def page_size():
+    default = current_app.config.get('PAGE_SIZE_DEFAULT', 50)
+    maximum = current_app.config.get('PAGE_SIZE_MAX', 200)
+    size = request.args.get('limit', default, type=int)
+    return max(1, min(size, maximum))
+
+
+def _seek(columns, values, descending):
+    """``(c1, c2, ...) > (v1, v2, ...)`` written so the leading column stays index-searchable."""
+    first, rest = columns[0], columns[1:]
+    if not rest:
+        return first < values[0] if descending else first > values[0]
+    tail = _seek(rest, values[1:], descending)
+    if descending:
+        return and_(first <= values[0], or_(first < values[0], tail))
+    return and_(first >= values[0], or_(first > values[0], tail))
+
+
+def keyset_page(query, columns, descending=False, cursor_arg='cursor', size=None):
+    """Return ``(rows, next_cursor)`` for the page after ``request.args[cursor_arg]``.
+
+    ``columns`` must end in a unique column (usually the primary key) so the
+    ordering is total and stable.
+    """
+    size = size or page_size()
+    token = request.args.get(cursor_arg)
+    if token:
+        values = decode_cursor(token, columns)
+        if values is not None:
+            query = query.filter(_seek(columns, values, descending))
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def offset_page(query, order, cursor_arg='cursor', size=None):
+    """Return ``(rows, next_cursor)`` where the cursor is a row offset.
+
+    For relevance-ranked results, which have no stable seek key; the match
+    set is ranked as a whole anyway, so skipping rows costs little extra.
+    """
+    size = size or page_size()
+    offset = max(0, request.args.get(cursor_arg, 0, type=int))
+    rows = query.order_by(*order).offset(offset).limit(size + 1).all()
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = str(offset + size)
+    return rows, next_cursor
+
+
+def next_page_url(next_cursor, cursor_arg='cursor'):
+    """URL of the current endpoint with ``cursor_arg`` advanced, other query args kept."""
+    if not next_cursor:
+        return None
+    args = request.args.to_dict()
+    args.update(request.view_args or {})
+    args[cursor_arg] = next_cursor
+    return url_for(request.endpoint, **args)
@@ -0,0 +1,76 @@
+"""
+Password hashing off the request threads.
+
+Hashing and verification run on a small dedicated thread pool
+(``PASSWORD_HASH_WORKERS``); the PBKDF2 work happens inside hashlib with the
+GIL released, so at most that many cores are ever busy hashing no matter how
+many logins arrive. Requests beyond ``PASSWORD_HASH_QUEUE`` waiting hashes
+are turned away immediately with ``HashingBusy`` instead of queueing behind
+the CPU-bound work and starving normal traffic; so are callers that waited
+longer than ``PASSWORD_HASH_TIMEOUT`` seconds.
+
+The cost is configured with ``PASSWORD_HASH_ROUNDS``; hashes created with
+other parameters are upgraded transparently on the next successful login.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+from passlib.context import CryptContext
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._context = None
+        self._rounds = None
+        self._executor = None
+        self._slots = None
+
+    def context(self):
+        rounds = current_app.config.get('PASSWORD_HASH_ROUNDS', 29000)
+        if self._context is None or self._rounds != rounds:
+            with self._lock:
+                self._context = CryptContext(schemes=['pbkdf2_sha256'], pbkdf2_sha256__rounds=rounds)
+                self._rounds = rounds
+        return self._context
+
+    def _run(self, func, *args):
+        cfg = current_app.config
+        workers = cfg.get('PASSWORD_HASH_WORKERS', 2)
+        if not workers:
+            return func(*args)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+                    self._slots = threading.BoundedSemaphore(workers + cfg.get('PASSWORD_HASH_QUEUE', 32))
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the work is done (or cancelled), not until this
+        # caller stops waiting, so abandoned hashes still count against the limit.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=cfg.get('PASSWORD_HASH_TIMEOUT', 10))
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(self.context().hash, password)
+
+    def verify_and_update(self, password, password_hash):
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored hash needs an upgrade."""
+        return self._run(self.context().verify_and_update, password, password_hash)
+
+
+password_hasher = PasswordHasher()
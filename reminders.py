@@ -0,0 +1,76 @@
+"""
+Booking reminders derived from the Booking table.
+
+Instead of one scheduler job per booking, a single periodic sweep looks for
+active bookings starting within ``REMINDER_LEAD_HOURS`` that have not been
+reminded yet (one range query on the (status, start_time) index), claims
+them with a conditional UPDATE and queues the reminder emails in the outbox
+in the same transaction. Any number of processes may run the sweep: the
+claim only succeeds for rows nobody else has claimed, so each reminder is
+queued exactly once. Cancelled bookings drop out of the query by status.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+from models import Booking, User
+from outbox import enqueue_mail
+
+
+def sweep_reminders(now=None):
+    """Claim due reminders and queue their emails; returns how many were queued."""
+    cfg = current_app.config
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(hours=cfg.get('REMINDER_LEAD_HOURS', 24))
+    batch_size = cfg.get('REMINDER_BATCH_SIZE', 500)
+    token = uuid.uuid4().hex
+    due = (
+        (Booking.status == 'booked')
+        & (Booking.start_time > now)
+        & (Booking.start_time <= horizon)
+        & Booking.reminder_sent_at.is_(None)
+    )
+    ids = [row.id for row in db.session.query(Booking.id).filter(due).order_by(Booking.start_time).limit(batch_size)]
+    if not ids:
+        db.session.rollback()
+        return 0
+    Booking.query.filter(Booking.id.in_(ids), due).update(
+        {'reminder_sent_at': now, 'reminder_claimed_by': token},
+        synchronize_session=False,
+    )
+    claimed = (
+        db.session.query(Booking.id, Booking.start_time, User.email)
+        .join(User, User.id == Booking.user_id)
+        .filter(Booking.reminder_claimed_by == token)
+        .all()
+    )
+    for booking_id, start_time, email in claimed:
+        enqueue_mail(email, 'Booking reminder', f'Reminder for booking #{booking_id} at {start_time}')
+    db.session.commit()
+    return len(claimed)
+
+
+def schedule_reminder_sweep(app, scheduler):
+    """Register the periodic sweep on ``scheduler`` (one job, whatever the booking count)."""
+
+    def run():
+        with app.app_context():
+            try:
+                # keep sweeping while full batches come back
+                while sweep_reminders() >= app.config.get('REMINDER_BATCH_SIZE', 500):
+                    pass
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning('Reminder sweep failed: %s', e)
+
+    scheduler.add_job(
+        func=run,
+        trigger='interval',
+        seconds=app.config.get('REMINDER_SWEEP_SECONDS', 60),
+        id='reminder_sweep',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
@@ -0,0 +1,202 @@
+"""
+Read-replica routing.
+
+Set ``DATABASE_REPLICA_URLS`` (comma-separated) to send the SELECTs of views
+marked ``@replica_read`` to a replica; everything else uses the primary
+(``DATABASE_URL``). Within such a view a statement still goes to the primary
+when:
+
+* it is not a plain SELECT (writes, ``FOR UPDATE``), or the session already
+  wrote in this request;
+* the user wrote within the last ``READ_AFTER_WRITE_SECONDS``, so they see
+  their own changes (the deadline is kept in their session cookie);
+* no replica is healthy.
+
+Replicas are checked at most every ``REPLICA_CHECK_SECONDS`` when picked: one
+that fails ``SELECT 1`` or lags more than ``REPLICA_MAX_LAG_SECONDS`` is
+skipped until a later check passes. Lag is the replay delay on PostgreSQL and
+the age of the file on SQLite, whose replicas are read-only copies refreshed
+by ``flask replica-copy``.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session as cookie_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+import storage
+
+STICKY_KEY = '_primary_until'
+
+
+class Replica:
+    def __init__(self, url):
+        url = make_url(url)
+        self.name = url.render_as_string(hide_password=True)
+        if url.get_backend_name() == 'sqlite':
+            # read-only, and a new connection per checkout so a refreshed copy is picked up
+            self.path = url.database
+            url = url.set(database=f'file:{url.database}', query={'mode': 'ro', 'uri': 'true'})
+            self.engine = create_engine(url, poolclass=NullPool)
+        else:
+            self.path = None
+            self.engine = create_engine(url, **storage.engine_options(str(url)))
+        self.healthy = True
+        self.checked_at = 0.0
+        self.lag = None
+        self._lock = threading.Lock()
+
+    def _lag(self, conn):
+        if self.path is not None:
+            return time.time() - os.path.getmtime(self.path)
+        if self.engine.dialect.name == 'postgresql':
+            lag = conn.execute(text(
+                'SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')).scalar()
+            return float(lag or 0)
+        return 0.0
+
+    def check(self, max_lag):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+                self.lag = self._lag(conn)
+            self.healthy = self.lag <= max_lag
+        except Exception as e:
+            self.healthy = False
+            current_app.logger.warning('Replica %s failed its health check: %s', self.name, e)
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._replicas = None
+        self._urls = ()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('DATABASE_REPLICA_URLS', os.getenv('DATABASE_REPLICA_URLS', ''))
+        app.config.setdefault('REPLICA_CHECK_SECONDS', float(os.getenv('REPLICA_CHECK_SECONDS', 5)))
+        app.config.setdefault('REPLICA_MAX_LAG_SECONDS', float(os.getenv('REPLICA_MAX_LAG_SECONDS', 30)))
+        app.config.setdefault('READ_AFTER_WRITE_SECONDS', float(os.getenv('READ_AFTER_WRITE_SECONDS', 30)))
+        self._urls = tuple(u.strip() for u in app.config['DATABASE_REPLICA_URLS'].split(',') if u.strip())
+        self._replicas = None
+
+    @property
+    def replicas(self):
+        if self._replicas is None:
+            with self._lock:
+                if self._replicas is None:
+                    self._replicas = [Replica(url) for url in self._urls]
+        return self._replicas
+
+    def pick(self):
+        """A healthy replica engine, round robin, or None to use the primary."""
+        if not self._urls:
+            return None
+        cfg = current_app.config
+        replicas = self.replicas
+        for _ in range(len(replicas)):
+            with self._lock:
+                replica = replicas[self._next % len(replicas)]
+                self._next += 1
+            if time.monotonic() - replica.checked_at >= cfg['REPLICA_CHECK_SECONDS'] and replica._lock.acquire(False):
+                try:
+                    replica.check(cfg['REPLICA_MAX_LAG_SECONDS'])
+                finally:
+                    replica._lock.release()
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def status(self):
+        return [{'replica': r.name, 'healthy': r.healthy, 'lag_seconds': r.lag} for r in self.replicas]
+
+
+router = ReplicaRouter()
+
+
+def replica_read(view):
+    """Let ``view`` read from a replica (see the module docstring for the exceptions)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_read = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def use_primary():
+    """Send the rest of this request's reads to the primary."""
+    if has_request_context():
+        g.replica_read = False
+
+
+def _wants_replica(session, clause):
+    if not has_request_context() or not g.get('replica_read') or session.info.get('wrote'):
+        return False
+    if not getattr(clause, 'is_select', False) or getattr(clause, '_for_update_arg', None) is not None:
+        return False
+    return cookie_session.get(STICKY_KEY, 0) < time.time()
+
+
+def read_engine():
+    """Engine for a raw read in this request: a replica when allowed, else None."""
+    if has_request_context() and g.get('replica_read') and cookie_session.get(STICKY_KEY, 0) < time.time():
+        return router.pick()
+    return None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from a replica where ``_wants_replica`` allows."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _wants_replica(self, clause):
+            engine = router.pick()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _do_orm_execute(state):
+    if not state.is_select:
+        state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        # read your own writes from the primary for a while
+        cookie_session[STICKY_KEY] = time.time() + current_app.config.get('READ_AFTER_WRITE_SECONDS', 30)
+
+
+def copy_sqlite(primary, replica):
+    """Snapshot the SQLite file ``primary`` to ``replica`` atomically (for local replica setups)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(replica)), suffix='.tmp')
+    os.close(fd)
+    try:
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(tmp)
+        with target:
+            source.backup(target)
+        # a copy in rollback-journal mode: readers open it read-only, with no -wal file
+        target.execute('PRAGMA journal_mode=DELETE')
+        target.close()
+        source.close()
+        os.replace(tmp, replica)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,98 @@
+"""
+Booking overlap rules and retry policy.
+
+Shared by the monolith (``reservations.py``) and the booking service so that
+both accept exactly the same bookings; each side only supplies its own model
+and locking. A booking occupies its staff member on ``[start_time, end_time)``
+and only ``booked`` bookings count, so two bookings clash when each starts
+before the other ends. Lock conflicts are retried with jittered backoff,
+``BOOKING_RESERVE_ATTEMPTS`` times in all.
+"""
+import random
+import time
+from bisect import bisect_right, insort
+from collections import defaultdict
+
+from sqlalchemy.exc import OperationalError
+
+ACTIVE = 'booked'
+DEFAULT_ATTEMPTS = 8
+
+_MISSING = object()
+
+
+def overlapping(model, staff_ids, start_time, end_time):
+    """Criteria for active bookings of ``staff_ids`` that overlap ``[start_time, end_time)``."""
+    return (
+        model.staff_id.in_(staff_ids),
+        model.status == ACTIVE,
+        model.start_time < end_time,
+        model.end_time > start_time,
+    )
+
+
+def fits(busy, start_time, end_time):
+    """``busy`` is a start-sorted list of non-overlapping ``(start, end)`` intervals."""
+    pos = bisect_right(busy, (start_time, end_time))
+    if pos and busy[pos - 1][1] > start_time:
+        return False
+    return pos == len(busy) or busy[pos][0] >= end_time
+
+
+def busy_intervals(session, model, staff_ids, items):
+    """Sorted intervals per staff member of the active bookings in the span of ``items`` (one query)."""
+    busy = defaultdict(list)
+    if not staff_ids:
+        return busy
+    lo = min(item['start_time'] for item in items)
+    hi = max(item['end_time'] for item in items)
+    existing = session.query(model.staff_id, model.start_time, model.end_time).filter(
+        *overlapping(model, staff_ids, lo, hi))
+    for staff_id, start_time, end_time in existing:
+        insort(busy[staff_id], (start_time, end_time))
+    return busy
+
+
+def assign(items, busy, all_staff=None):
+    """Check ``items`` in order against ``busy`` and against each other.
+
+    An item without ``staff_id`` gets the first of ``all_staff`` who is free
+    (or no staff member when ``all_staff`` is None). Returns one result dict
+    per item and the rows to insert for the accepted ones.
+    """
+    results, rows = [], []
+    for item in items:
+        candidates = [item['staff_id']] if item.get('staff_id') is not None else (all_staff or [None])
+        chosen = next(
+            (s for s in candidates if s is None or fits(busy[s], item['start_time'], item['end_time'])),
+            _MISSING,
+        )
+        if chosen is _MISSING:
+            results.append({'status': 'conflict', 'error': 'Staff member already booked for that time'})
+            continue
+        if chosen is not None:
+            insort(busy[chosen], (item['start_time'], item['end_time']))
+        rows.append({
+            'user_id': item['user_id'],
+            'service_id': item['service_id'],
+            'staff_id': chosen,
+            'start_time': item['start_time'],
+            'end_time': item['end_time'],
+            'notes': item.get('notes'),
+        })
+        results.append({'status': 'booked', 'staff_id': chosen})
+    return results, rows
+
+
+def with_retries(session, work, attempts=None):
+    """Run ``work()``, rolling back and retrying on lock conflicts; re-raises the last one."""
+    attempts = attempts or DEFAULT_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            return work()
+        except OperationalError:
+            session.rollback()
+            if attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, 0.005 * 2 ** attempt))
+    return None
@@ -0,0 +1,113 @@
+"""
+Atomic booking reservation.
+
+The overlap check and the insert run in one transaction. On server databases
+the staff member's user row is locked (SELECT ... FOR UPDATE) so concurrent
+reservations for the same staff member serialise while different staff
+members proceed in parallel; on SQLite the database write lock gives the same
+guarantee. Lock conflicts (``database is locked``, deadlocks, serialisation
+failures) are retried with jittered backoff instead of taking a global lock.
+The overlap rules and the retry policy are shared with the booking service
+(see ``reservation_rules.py``).
+"""
+from flask import current_app
+from sqlalchemy import insert, update
+
+from extensions import db
+from models import Booking, OutboxMessage, Role, User
+from reservation_rules import assign, busy_intervals, overlapping, with_retries
+import rollups
+
+
+def _attempts():
+    return current_app.config.get('BOOKING_RESERVE_ATTEMPTS')
+
+
+def reserve_booking(before_commit=None, **fields):
+    """Insert a ``Booking`` unless it overlaps an active booking of the same staff member.
+
+    ``before_commit(booking)`` runs inside the transaction once the slot is
+    secured, e.g. to queue the confirmation email atomically with the booking.
+    Returns the committed booking, or None when the slot is already taken.
+    Raises the last ``OperationalError`` if the retries are exhausted.
+    """
+    staff_id = fields.get('staff_id')
+
+    def attempt():
+        if staff_id is not None:
+            db.session.query(User.id).filter(User.id == staff_id).with_for_update().first()
+        booking = Booking(**fields)
+        db.session.add(booking)
+        db.session.flush()
+        if staff_id is not None and Booking.query.filter(
+            *overlapping(Booking, [staff_id], booking.start_time, booking.end_time), Booking.id != booking.id
+        ).count():
+            db.session.rollback()
+            return None
+        if before_commit is not None:
+            before_commit(booking)
+        db.session.commit()
+        return booking
+
+    return with_retries(db.session, attempt, _attempts())
+
+
+def _lock_staff(staff_ids):
+    """Serialise booking writers for these staff members until the transaction ends."""
+    ids = sorted(staff_ids)
+    if db.engine.dialect.name == 'sqlite':
+        # No row locks on SQLite: take the database write lock before reading
+        db.session.execute(update(User).where(User.id.in_(ids)).values(id=User.id))
+    else:
+        db.session.query(User.id).filter(User.id.in_(ids)).order_by(User.id).with_for_update().all()
+
+
+def reserve_bookings(items, send_confirmations=True):
+    """Reserve many bookings in one transaction.
+
+    ``items`` are dicts with ``user_id``, ``service_id``, ``start_time``,
+    ``end_time`` and optionally ``staff_id`` (omitted: first free staff member)
+    and ``notes``. All items are checked against existing bookings with one
+    range query and against each other, the accepted ones are inserted with a
+    single executemany, and their confirmation emails are queued in the same
+    transaction. Returns one result dict per item, in order.
+    """
+    if not items:
+        return []
+    return with_retries(db.session, lambda: _reserve_bookings(items, send_confirmations), _attempts())
+
+
+def _reserve_bookings(items, send_confirmations):
+    all_staff = None
+    if any(item.get('staff_id') is None for item in items):
+        all_staff = [row.id for row in db.session.query(User.id).filter(User.role == Role.STAFF).order_by(User.id)]
+    staff_ids = {item['staff_id'] for item in items if item.get('staff_id') is not None}
+    staff_ids.update(all_staff or [])
+    if staff_ids:
+        _lock_staff(staff_ids)
+
+    busy = busy_intervals(db.session, Booking, staff_ids, items)
+    results, rows = assign(items, busy, all_staff)
+
+    if rows:
+        ids = db.session.execute(
+            insert(Booking).returning(Booking.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        booked = [r for r in results if r['status'] == 'booked']
+        for result, booking_id in zip(booked, ids):
+            result['booking_id'] = booking_id
+        if send_confirmations:
+            emails = dict(db.session.query(User.id, User.email).filter(User.id.in_({r['user_id'] for r in rows})))
+            db.session.execute(insert(OutboxMessage), [
+                {
+                    'recipient': emails[row['user_id']],
+                    'subject': 'Booking confirmation',
+                    'body': f"Your booking #{booking_id} is confirmed for {row['start_time']}",
+                }
+                for row, booking_id in zip(rows, ids)
+                if row['user_id'] in emails
+            ])
+        rollups.record(rows, 'created')
+    db.session.commit()
+    return results
+
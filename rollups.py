@@ -0,0 +1,164 @@
+"""
+Booking rollups for the admin dashboard.
+
+``BookingRollup`` keeps counters per day x service x staff member. Booking
+writes call ``record`` in their own transaction (create, cancel, complete),
+which adds the deltas with one upsert per batch, so the dashboard reads a
+few rollup rows instead of scanning ``Booking``. Revenue and booked minutes
+use the service's price and duration. ``backfill`` rebuilds the counters from
+the booking and archive tables, e.g. after bulk imports or price changes.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+import archive
+from extensions import db
+from models import BookingRollup, Service, User
+
+KEY = ('day', 'service_id', 'staff_id')
+COUNTERS = ('bookings', 'cancelled', 'completed', 'revenue', 'booked_minutes')
+
+
+def _services(service_ids):
+    rows = db.session.query(Service.id, Service.price, Service.duration_minutes).filter(Service.id.in_(service_ids))
+    return {sid: (price, minutes) for sid, price, minutes in rows}
+
+
+def _field(booking, name):
+    return booking[name] if isinstance(booking, dict) else getattr(booking, name)
+
+
+def record(bookings, event):
+    """Add ``event`` ('created', 'cancelled' or 'completed') for ``bookings`` to the rollups.
+
+    ``bookings`` are Booking objects or dicts with start_time, service_id and
+    staff_id. Runs in the caller's transaction; nothing is committed here.
+    """
+    if not bookings:
+        return
+    services = _services({_field(b, 'service_id') for b in bookings})
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for booking in bookings:
+        service_id = _field(booking, 'service_id')
+        price, minutes = services.get(service_id, (0, 0))
+        row = deltas[(_field(booking, 'start_time').date(), service_id, _field(booking, 'staff_id') or 0)]
+        if event == 'created':
+            row['bookings'] += 1
+            row['revenue'] += price
+            row['booked_minutes'] += minutes
+        elif event == 'cancelled':
+            row['cancelled'] += 1
+            row['revenue'] -= price
+            row['booked_minutes'] -= minutes
+        elif event == 'completed':
+            row['completed'] += 1
+    _upsert([dict(zip(KEY, key), **counters) for key, counters in deltas.items()])
+
+
+def _upsert(rows):
+    """Add each row's counters to the matching rollup row, creating it if needed."""
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(BookingRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY),
+            set_={c: getattr(BookingRollup, c) + getattr(stmt.excluded, c) for c in COUNTERS},
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        updated = BookingRollup.query.filter_by(**{k: row[k] for k in KEY}).update(
+            {c: getattr(BookingRollup, c) + row[c] for c in COUNTERS}, synchronize_session=False)
+        if not updated:
+            db.session.add(BookingRollup(**row))
+            db.session.flush()
+
+
+def backfill(start=None, end=None):
+    """Recompute rollups for bookings starting in ``[start, end)`` (dates); returns rows written."""
+    as_time = lambda d: datetime.combine(d, datetime.min.time()) if d is not None else None
+    # archived bookings still count
+    booking = archive.history(as_time(start), as_time(end))
+    day = func.date(booking.c.start_time)
+    staff_id = func.coalesce(booking.c.staff_id, 0)
+    active = booking.c.status != 'cancelled'
+    query = (
+        db.session.query(
+            day, booking.c.service_id, staff_id,
+            func.count(booking.c.id),
+            func.sum(case((booking.c.status == 'cancelled', 1), else_=0)),
+            func.sum(case((booking.c.status == 'completed', 1), else_=0)),
+            func.sum(case((active, Service.price), else_=0)),
+            func.sum(case((active, Service.duration_minutes), else_=0)),
+        )
+        .join(Service, Service.id == booking.c.service_id)
+        .group_by(day, booking.c.service_id, staff_id)
+    )
+    stale = BookingRollup.query
+    if start is not None:
+        stale = stale.filter(BookingRollup.day >= start)
+    if end is not None:
+        stale = stale.filter(BookingRollup.day < end)
+    rows = [
+        {
+            # SQLite returns date() as text
+            'day': d if isinstance(d, date) else date.fromisoformat(d),
+            'service_id': service_id, 'staff_id': staff_id, 'bookings': bookings, 'cancelled': cancelled,
+            'completed': completed, 'revenue': revenue or 0, 'booked_minutes': minutes or 0,
+        }
+        for d, service_id, staff_id, bookings, cancelled, completed, revenue, minutes in query
+    ]
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(BookingRollup), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def summary(days=30, today=None):
+    """Dashboard figures for the last ``days`` days, read from the rollups only."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    in_range = (BookingRollup.day >= start) & (BookingRollup.day <= today)
+    totals = (func.sum(BookingRollup.bookings), func.sum(BookingRollup.cancelled), func.sum(BookingRollup.revenue))
+
+    per_day = (
+        db.session.query(BookingRollup.day, *totals).filter(in_range)
+        .group_by(BookingRollup.day).order_by(BookingRollup.day).all()
+    )
+    per_service = (
+        db.session.query(BookingRollup.service_id, Service.name, *totals)
+        .outerjoin(Service, Service.id == BookingRollup.service_id).filter(in_range)
+        .group_by(BookingRollup.service_id, Service.name).order_by(func.sum(BookingRollup.bookings).desc()).all()
+    )
+    per_staff = (
+        db.session.query(BookingRollup.staff_id, User.name, func.sum(BookingRollup.booked_minutes))
+        .outerjoin(User, User.id == BookingRollup.staff_id).filter(in_range, BookingRollup.staff_id != 0)
+        .group_by(BookingRollup.staff_id, User.name).all()
+    )
+
+    cfg = current_app.config
+    open_minutes = (cfg.get('BOOKING_CLOSE_HOUR', 18) - cfg.get('BOOKING_OPEN_HOUR', 9)) * 60 * days
+    bookings = sum(r[1] for r in per_day)
+    cancelled = sum(r[2] for r in per_day)
+    return {
+        'start': start,
+        'end': today,
+        'bookings': bookings,
+        'revenue': sum(r[3] for r in per_day),
+        'cancellation_rate': cancelled / bookings if bookings else 0,
+        'per_day': [{'day': d, 'bookings': n, 'cancelled': c, 'revenue': rev} for d, n, c, rev in per_day],
+        'per_service': [
+            {'service': name or f'#{sid}', 'bookings': n, 'cancelled': c, 'revenue': rev}
+            for sid, name, n, c, rev in per_service
+        ],
+        'per_staff': [
+            {'staff': name or f'#{sid}', 'booked_minutes': m,
+             'utilisation': m / open_minutes if open_minutes else 0}
+            for sid, name, m in per_staff
+        ],
+    }
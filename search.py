@@ -0,0 +1,130 @@
+"""
+Service catalog search and filtering.
+
+Shared by the monolith and the service-catalog service, which each pass their
+own ``Service`` model. On SQLite the text search uses an FTS5 index over
+name and description (``service_fts``, an external-content table kept in sync
+by triggers on ``service``) ranked by bm25 with name matches weighted higher.
+Other backends, or a SQLite build without FTS5, fall back to LIKE over the
+same columns, ranking name matches first. The monolith creates the index in
+migration 0006; the catalog service, which has no migrations, calls
+``create_index`` at startup.
+"""
+import re
+
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table
+
+# Relative weight of a match in the name vs the description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_indexed = {}   # (engine url, table) -> whether the FTS index exists
+
+
+def fts_name(table_name):
+    return f'{table_name}_fts'
+
+
+def index_ddl(table_name='service'):
+    """Statements creating the FTS5 index over ``table_name`` and its sync triggers."""
+    fts = fts_name(table_name)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"name, description, content='{table_name}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+        f"INSERT INTO {fts}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def fts5_available(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    options = {row[0] for row in connection.exec_driver_sql('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in options
+
+
+def create_index(connection, table_name='service'):
+    """Create (or rebuild) the FTS index on SQLite; returns False where it is not supported."""
+    if not fts5_available(connection):
+        return False
+    for statement in index_ddl(table_name):
+        connection.exec_driver_sql(statement)
+    _indexed[(str(connection.engine.url), table_name)] = True
+    return True
+
+
+def has_index(session, table_name='service'):
+    engine = session.get_bind()
+    key = (str(engine.url), table_name)
+    if key not in _indexed:
+        master = table('sqlite_master', column('type'), column('name'))
+        # a plain SELECT, so views reading from a replica stay there (see replicas.py)
+        _indexed[key] = engine.dialect.name == 'sqlite' and session.execute(
+            select(literal_column('1')).select_from(master).where(
+                master.c.type == 'table', master.c.name == fts_name(table_name))
+        ).first() is not None
+    return _indexed[key]
+
+
+def terms(q):
+    """Words of a user query, lowercased; punctuation and FTS syntax are dropped."""
+    return re.findall(r'\w+', (q or '').lower())[:10]
+
+
+def _like(word):
+    return '%' + word.replace('_', '\\_') + '%'
+
+
+def filters_from(args):
+    """Search and filter parameters from request args; unparseable values are ignored."""
+    return {
+        'q': ' '.join(terms(args.get('q'))) or None,
+        'category_id': args.get('category', type=int),
+        'min_price': args.get('min_price', type=float),
+        'max_price': args.get('max_price', type=float),
+        'min_duration': args.get('min_duration', type=int),
+        'max_duration': args.get('max_duration', type=int),
+    }
+
+
+def apply(query, model, session, q=None, category_id=None, min_price=None, max_price=None,
+          min_duration=None, max_duration=None):
+    """Filter ``query`` over ``model``; returns ``(query, rank)``.
+
+    ``rank`` is an expression to order by (lower is better) when ``q`` is
+    given, otherwise None and the caller keeps its own ordering.
+    """
+    if category_id is not None:
+        query = query.filter(model.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(model.price >= min_price)
+    if max_price is not None:
+        query = query.filter(model.price <= max_price)
+    if min_duration is not None:
+        query = query.filter(model.duration_minutes >= min_duration)
+    if max_duration is not None:
+        query = query.filter(model.duration_minutes <= max_duration)
+    words = terms(q)
+    if not words:
+        return query, None
+
+    table_name = model.__tablename__
+    if has_index(session, table_name):
+        name = fts_name(table_name)
+        fts = table(name, column('rowid'), column(name))
+        # every word, as a prefix: "swedish mass" finds "Swedish massage"
+        match = ' '.join(f'"{w}"*' for w in words)
+        query = query.join(fts, fts.c.rowid == model.id).filter(fts.c[name].match(match))
+        return query, func.bm25(literal_column(name), NAME_WEIGHT, DESCRIPTION_WEIGHT)
+
+    query = query.filter(and_(*[
+        or_(model.name.ilike(_like(w), escape='\\'), model.description.ilike(_like(w), escape='\\')) for w in words
+    ]))
+    in_name = and_(*[model.name.ilike(_like(w), escape='\\') for w in words])
+    return query, case((in_name, 0), else_=1)
@@ -1,20 +1,81 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import zlib
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, session
+from flask_login import current_user
 from extensions import db
-from models import Service, ServiceCategory
+from models import Service
+from pagination import keyset_page, next_page_url, offset_page, page_size
+from catalog_cache import catalog_cache, service_snapshot
+from http_caching import conditional, timestamp
+from replicas import replica_read
+import search
+from sqlalchemy.orm import joinedload
 
 services_bp = Blueprint('services', __name__, template_folder='templates')
 
 
+def catalog_validators(*args, **kwargs):
+    """ETag/Last-Modified for catalog pages, from the cache generations alone.
+
+    Pages also render the navbar for the current user, so a signed-in user's
+    ETag covers who they are and the response is private; anonymous pages may
+    be shared by caches for CATALOG_HTTP_MAX_AGE seconds.
+    """
+    if session.get('_flashes'):
+        return None   # render now, the flashed messages are shown once
+    services_gen, categories_gen = catalog_cache.version()
+    if current_user.is_authenticated:
+        user = f'{current_user.id}:{current_user.role}:{current_user.name}:{current_user.email}'
+        viewer = f'u{zlib.crc32(user.encode()):x}'
+        cache_control = 'private, no-cache'
+    else:
+        viewer = 'anon'
+        cache_control = f'public, max-age={current_app.config["CATALOG_HTTP_MAX_AGE"]}'
+    return {
+        'etag': f'{services_gen:x}-{categories_gen:x}-{viewer}',
+        'last_modified': timestamp(max(services_gen, categories_gen)),
+        'cache_control': cache_control,
+        'vary': 'Cookie',
+    }
+
+
+def service_validators(service_id):
+    # an unknown id gets its 404, never a 304
+    if catalog_cache.service(service_id) is None:
+        return None
+    return catalog_validators()
+
+
 @services_bp.route('/')
+@replica_read
+@conditional(catalog_validators)
 def list_services():
-    services = Service.query.all()
-    categories = ServiceCategory.query.all()
-    return render_template('services/list.html', services=services, categories=categories)
+    # ?q= full-text search (ranked), ?category=, ?min_price=/?max_price=, ?min_duration=/?max_duration=
+    filters = search.filters_from(request.args)
+
+    def load():
+        query = Service.query.options(joinedload(Service.category))
+        query, rank = search.apply(query, Service, db.session, **filters)
+        if rank is None:
+            rows, cursor = keyset_page(query, [Service.id])
+        else:
+            rows, cursor = offset_page(query, [rank, Service.id])
+        return [service_snapshot(s) for s in rows], cursor
+
+    params = tuple(sorted(filters.items())) + (request.args.get('cursor'), page_size())
+    services, next_cursor = catalog_cache.services_page(params, load)
+    categories = catalog_cache.categories()
+    return render_template('services/list.html', services=services, categories=categories, filters=filters,
+                           next_url=next_page_url(next_cursor))
 
 
 @services_bp.route('/<int:service_id>')
+@replica_read
+@conditional(service_validators)
 def view_service(service_id):
-    service = Service.query.get_or_404(service_id)
+    service = catalog_cache.service(service_id)
+    if service is None:
+        abort(404)
     return render_template('services/view.html', service=service)
 
 
@@ -30,9 +91,10 @@ def create_service():
         svc = Service(name=name, price=price, duration_minutes=duration, description=desc, category_id=category_id)
         db.session.add(svc)
         db.session.commit()
+        catalog_cache.service_created()
         flash('Service created')
         return redirect(url_for('services.list_services'))
-    categories = ServiceCategory.query.all()
+    categories = catalog_cache.categories()
     return render_template('services/create.html', categories=categories)
 
 
@@ -43,5 +105,6 @@ def delete_service(service_id):
     # TODO: Check if service has any bookings before deleting
     db.session.delete(service)
     db.session.commit()
+    catalog_cache.service_deleted(service_id)
     flash('Service deleted successfully')
     return redirect(url_for('services.list_services'))
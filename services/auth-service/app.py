@@ -1,14 +1,48 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, jwt_required
+from datetime import timedelta
+from functools import wraps
+import hmac
 import os
+import sys
+import time
+
+# Shared modules (storage, ...) live at the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import instrumentation  # noqa: E402
+import storage  # noqa: E402
+import token_auth  # noqa: E402
+from passwords import HashingBusy, password_hasher  # noqa: E402
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///auth.db')
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+storage.configure(app, 'sqlite:///auth.db')
+
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
+
+
+# Access tokens: the newest key signs, all listed keys verify (see token_auth.py).
+# HMAC uses the shared JWT_SECRET_KEYS; RS256/ES256 sign with JWT_PRIVATE_KEY_FILE
+# and publish JWT_PUBLIC_KEY_FILES ('kid:path,...', the signing key's first) at /auth/keys.
+ALGORITHM = token_auth.algorithm()
+if ALGORITHM in token_auth.HMAC_ALGORITHMS:
+    VERIFY_KEYS = token_auth.hmac_keys()
+    app.config['JWT_SECRET_KEY'] = next(iter(VERIFY_KEYS.values()))
+else:
+    VERIFY_KEYS = {kid: read_file(path) for kid, path in token_auth.parse_keys(os.getenv('JWT_PUBLIC_KEY_FILES')).items()}
+    app.config['JWT_PRIVATE_KEY'] = read_file(os.environ['JWT_PRIVATE_KEY_FILE'])
+SIGNING_KID = next(iter(VERIFY_KEYS))
+app.config['JWT_ALGORITHM'] = ALGORITHM
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_SECONDS', 900)))
+app.config['JWT_ENCODE_ISSUER'] = token_auth.ISSUER
+app.config['JWT_DECODE_ISSUER'] = token_auth.ISSUER
+app.config['JWT_TOKEN_LOCATION'] = ['headers']
 
 db = SQLAlchemy(app)
+instrumentation.init_app(app, 'auth')
 jwt = JWTManager(app)
 
 class User(db.Model):
@@ -26,10 +60,149 @@ class User(db.Model):
             'role': self.role
         }
 
+
+class RevokedToken(db.Model):
+    """A revoked token (``jti``), or every token of ``user_id`` issued up to ``before``."""
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), index=True)
+    user_id = db.Column(db.Integer, index=True)
+    before = db.Column(db.Integer)
+    # Unix time after which no token it covers is valid anyway
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'user_id': self.user_id,
+            'before': self.before,
+            'expires_at': self.expires_at
+        }
+
+
+@jwt.decode_key_loader
+def decode_key(header, payload):
+    return VERIFY_KEYS.get(header.get('kid'), '')
+
+
+@jwt.token_in_blocklist_loader
+def is_revoked(header, payload):
+    return RevokedToken.query.filter(db.or_(
+        RevokedToken.jti == payload['jti'],
+        db.and_(RevokedToken.jti.is_(None), RevokedToken.user_id == payload.get('id'),
+                RevokedToken.before >= payload['iat']),
+    )).first() is not None
+
+
+def roles_required(*roles):
+    """Like ``jwt_required()``, and the token's role must be one of ``roles``."""
+    def decorator(view):
+        @wraps(view)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if get_jwt().get('role') not in roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def service_required(view):
+    """Only for the other services: the shared ``SERVICE_AUTH_KEY`` in the ``X-Service-Key`` header."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(token_auth.SERVICE_KEY_HEADER, '')
+        if not hmac.compare_digest(key.encode(), token_auth.service_key().encode()):
+            return jsonify({'error': 'Service key required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def access_token_lifetime():
+    return int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
+
 @app.route('/auth/health')
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'auth'})
 
+@app.route('/auth/token', methods=['POST'])
+def issue_token():
+    """Body: ``{"email", "password"}``; returns a short-lived bearer token for the other services."""
+    data = request.get_json(silent=True) or {}
+    user = User.query.filter_by(email=data.get('email')).first()
+    try:
+        valid, new_hash = password_hasher.verify_and_update(data.get('password') or '', user.password_hash)
+    except HashingBusy:
+        return jsonify({'error': 'Too many logins at once, try again shortly'}), 503
+    except (AttributeError, ValueError):
+        valid, new_hash = False, None   # no such user, or an unusable stored hash
+    if not valid:
+        return jsonify({'error': 'Invalid email or password'}), 401
+    if new_hash:
+        user.password_hash = new_hash
+        db.session.commit()
+    token = create_access_token(identity=str(user.id), additional_claims=user.to_dict(),
+                                additional_headers={'kid': SIGNING_KID})
+    return jsonify({'access_token': token, 'token_type': 'Bearer', 'expires_in': access_token_lifetime()})
+
+@app.route('/auth/revoke', methods=['POST'])
+@jwt_required()
+def revoke_token():
+    """Revoke the caller's token, or with ``{"user_id": n}`` (admins only) every token of that user so far."""
+    claims = get_jwt()
+    user_id = (request.get_json(silent=True) or {}).get('user_id')
+    now = int(time.time())
+    if user_id is None:
+        entry = RevokedToken(jti=claims['jti'], user_id=claims.get('id'), expires_at=claims['exp'])
+    elif claims.get('role') != 'admin':
+        return jsonify({'error': 'Forbidden'}), 403
+    elif not isinstance(user_id, int) or isinstance(user_id, bool):
+        return jsonify({'error': 'user_id must be an integer'}), 400
+    else:
+        entry = RevokedToken(user_id=user_id, before=now, expires_at=now + access_token_lifetime())
+    db.session.add(entry)
+    RevokedToken.query.filter(RevokedToken.expires_at <= now).delete()
+    db.session.commit()
+    return jsonify(entry.to_dict()), 201
+
+@app.route('/auth/revocations')
+@service_required
+def list_revocations():
+    """Unexpired revocations after ``?since=`` (the ``cursor`` of the previous call), oldest first."""
+    since = request.args.get('since', 0, type=int)
+    rows = (RevokedToken.query
+            .filter(RevokedToken.id > since, RevokedToken.expires_at > int(time.time()))
+            .order_by(RevokedToken.id).limit(1001).all())
+    more = len(rows) > 1000
+    rows = rows[:1000]
+    return jsonify({'revoked': [r.to_dict() for r in rows], 'cursor': rows[-1].id if rows else since, 'more': more})
+
+@app.route('/auth/keys')
+def verification_keys():
+    """Public keys by ``kid`` for asymmetric algorithms; HMAC secrets are never served."""
+    keys = [] if ALGORITHM in token_auth.HMAC_ALGORITHMS else [{'kid': k, 'key': v} for k, v in VERIFY_KEYS.items()]
+    return jsonify({'algorithm': ALGORITHM, 'keys': keys})
+
+# User details are for staff and admins (the notification service forwards their token)
+@app.route('/users/<int:user_id>')
+@roles_required('staff', 'admin')
+def get_user(user_id):
+    user = User.query.get_or_404(user_id)
+    return jsonify(user.to_dict())
+
+@app.route('/users')
+@roles_required('staff', 'admin')
+def list_users():
+    # Bulk lookup: GET /users?ids=1,2,3 (unknown ids are simply absent)
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i}
+    except ValueError:
+        return jsonify({'error': 'ids must be comma-separated integers'}), 400
+    if len(ids) > 500:
+        return jsonify({'error': 'at most 500 ids per request'}), 400
+    users = User.query.filter(User.id.in_(ids)).all() if ids else []
+    return jsonify([u.to_dict() for u in users])
+
 if __name__ == '__main__':
     db.create_all()
     port = int(os.getenv('PORT', 5001))
@@ -1,14 +1,34 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import insert, text
 from datetime import datetime
 import os
-import requests
+import sys
+
+# Shared modules (http_client, storage, ...) live at the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from http_client import ServiceClient, ServiceUnavailable  # noqa: E402
+import instrumentation  # noqa: E402
+import storage  # noqa: E402
+from reservation_rules import assign, busy_intervals, overlapping, with_retries  # noqa: E402
+from token_auth import TokenVerifier, forward_auth  # noqa: E402
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///bookings.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+storage.configure(app, 'sqlite:///bookings.db')
 
 db = SQLAlchemy(app)
+instrumentation.init_app(app, 'booking')
+catalog = ServiceClient(os.getenv('SERVICE_CATALOG_URL'))
+notifications = ServiceClient(os.getenv('NOTIFICATION_SERVICE_URL'))
+# Callers send an auth-service access token, checked locally (see token_auth.py)
+verifier = TokenVerifier()
+# Roles that may book for and see the bookings of other users
+STAFF_ROLES = ('admin', 'staff')
+# Lock-conflict retries per reservation, and the largest batch (and bulk lookup) accepted
+RESERVE_ATTEMPTS = int(os.getenv('BOOKING_RESERVE_ATTEMPTS', 8))
+MAX_BATCH_ITEMS = int(os.getenv('MAX_BATCH_ITEMS', 500))
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -20,7 +40,14 @@ class Booking(db.Model):
     status = db.Column(db.String(30), default='booked')
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
+
+    __table_args__ = (
+        db.Index('ix_booking_staff_id_start_time', 'staff_id', 'start_time'),
+        db.Index('ix_booking_user_id_start_time', 'user_id', 'start_time'),
+        db.Index('ix_booking_status_start_time', 'status', 'start_time'),
+        db.Index('ix_booking_start_time', 'start_time'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -34,50 +61,207 @@ class Booking(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+def reserve_booking(**fields):
+    """Insert a booking unless it overlaps an active booking of the same staff member.
+
+    Overlap check and insert share one transaction; on PostgreSQL a per-staff
+    advisory lock serialises reservations for that staff member only, on
+    SQLite the database write lock does. Lock conflicts are retried. The
+    overlap rules are the monolith's (see reservation_rules.py).
+    """
+    staff_id = fields.get('staff_id')
+
+    def attempt():
+        if staff_id is not None and db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': staff_id})
+        booking = Booking(**fields)
+        db.session.add(booking)
+        db.session.flush()
+        if staff_id is not None and Booking.query.filter(
+            *overlapping(Booking, [staff_id], booking.start_time, booking.end_time), Booking.id != booking.id
+        ).count():
+            db.session.rollback()
+            return None
+        db.session.commit()
+        return booking
+
+    return with_retries(db.session, attempt, RESERVE_ATTEMPTS)
+
+def reserve_bookings(items):
+    """Insert many bookings in one transaction, skipping the ones that overlap.
+
+    Existing bookings of all involved staff are read with one range query and
+    the batch is checked against them and against itself; accepted rows go in
+    with a single executemany. Returns one result dict per item.
+    """
+    staff_ids = sorted({item['staff_id'] for item in items if item.get('staff_id') is not None})
+
+    def attempt():
+        if db.engine.dialect.name == 'postgresql':
+            for staff_id in staff_ids:
+                db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': staff_id})
+        else:
+            # take the SQLite write lock before reading
+            db.session.execute(text('UPDATE booking SET id = id WHERE 0'))
+        results, rows = assign(items, busy_intervals(db.session, Booking, staff_ids, items))
+        if rows:
+            ids = db.session.execute(
+                insert(Booking).returning(Booking.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            for result, booking_id in zip((r for r in results if r['status'] == 'booked'), ids):
+                result['booking_id'] = booking_id
+        db.session.commit()
+        return results
+
+    return with_retries(db.session, attempt, RESERVE_ATTEMPTS)
+
 @app.route('/bookings/health')
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'booking'})
 
+def is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def acts_for(user_id):
+    return g.claims['role'] in STAFF_ROLES or user_id == g.claims['id']
+
 @app.route('/bookings', methods=['POST'])
+@verifier.require_auth()
 def create_booking():
     data = request.json
+    # Customers book for themselves; staff and admins may name another user_id
+    user_id = data.get('user_id', g.claims['id'])
+    if not acts_for(user_id):
+        return jsonify({'error': 'Forbidden'}), 403
     
-    # Validate service exists
-    service_url = f"{os.getenv('SERVICE_CATALOG_URL')}/services/{data['service_id']}"
-    service_response = requests.get(service_url)
+    # Validate service exists (catalog lookups are cached, services rarely change)
+    try:
+        service_response = catalog.get(f"/services/{data['service_id']}", cache=True)
+    except ServiceUnavailable:
+        return jsonify({'error': 'Service catalog unavailable'}), 503
     if service_response.status_code != 200:
         return jsonify({'error': 'Service not found'}), 404
     
     # Create booking
-    booking = Booking(
-        user_id=data['user_id'],
+    booking = reserve_booking(
+        user_id=user_id,
         service_id=data['service_id'],
         staff_id=data.get('staff_id'),
         start_time=datetime.fromisoformat(data['start_time']),
         end_time=datetime.fromisoformat(data['end_time']),
         notes=data.get('notes')
     )
+    if booking is None:
+        return jsonify({'error': 'Staff member already booked for that time'}), 409
     
-    db.session.add(booking)
-    db.session.commit()
-    
-    # Notify notification service
-    notification_url = f"{os.getenv('NOTIFICATION_SERVICE_URL')}/notifications"
+    # Notify notification service in the background; the booking is already committed
     notification_data = {
         'type': 'booking_created',
         'booking_id': booking.id,
         'user_id': booking.user_id
     }
-    requests.post(notification_url, json=notification_data)
+    notifications.post_later('/notifications', notification_data, headers=forward_auth())
     
     return jsonify(booking.to_dict()), 201
 
+@app.route('/bookings/batch', methods=['POST'])
+@verifier.require_auth()
+def create_bookings_batch():
+    """Body: ``{"items": [{"service_id", "start_time", "end_time", "user_id"?, "staff_id"?, "notes"?}, ...]}``."""
+    raw = (request.get_json(silent=True) or {}).get('items')
+    if not isinstance(raw, list) or not raw:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(raw) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'at most {MAX_BATCH_ITEMS} items per batch'}), 400
+
+    # Each distinct service is checked once (and usually served from the cache)
+    known = {}
+    try:
+        service_ids = {item['service_id'] for item in raw if isinstance(item, dict) and is_id(item.get('service_id'))}
+        for service_id in service_ids:
+            known[service_id] = catalog.get(f'/services/{service_id}', cache=True).status_code == 200
+    except ServiceUnavailable:
+        return jsonify({'error': 'Service catalog unavailable'}), 503
+
+    items, positions, results = [], [], [None] * len(raw)
+    for i, item in enumerate(raw):
+        try:
+            if not is_id(item['service_id']) or not known.get(item['service_id']):
+                results[i] = {'status': 'invalid', 'error': 'Service not found'}
+                continue
+            user_id = item.get('user_id', g.claims['id'])
+            staff_id = item.get('staff_id')
+            if not is_id(user_id) or (staff_id is not None and not is_id(staff_id)):
+                results[i] = {'status': 'invalid', 'error': 'user_id and staff_id must be integers'}
+                continue
+            if not acts_for(user_id):
+                results[i] = {'status': 'invalid', 'error': 'Forbidden'}
+                continue
+            start_time = datetime.fromisoformat(item['start_time'])
+            end_time = datetime.fromisoformat(item['end_time'])
+        except (KeyError, TypeError, ValueError):
+            results[i] = {'status': 'invalid', 'error': 'service_id, start_time and end_time are required'}
+            continue
+        if end_time <= start_time:
+            results[i] = {'status': 'invalid', 'error': 'end_time must be after start_time'}
+            continue
+        items.append({
+            'user_id': user_id,
+            'service_id': item['service_id'],
+            'staff_id': staff_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'notes': item.get('notes'),
+        })
+        positions.append(i)
+    user_ids = {}
+    for i, item, result in zip(positions, items, reserve_bookings(items) if items else []):
+        results[i] = result
+        user_ids[i] = item['user_id']
+
+    # One notification request for the whole batch, in the background
+    events = [
+        {'type': 'booking_created', 'booking_id': result['booking_id'], 'user_id': user_ids[i]}
+        for i, result in enumerate(results) if result['status'] == 'booked'
+    ]
+    if events:
+        notifications.post_later('/notifications/batch', {'events': events}, headers=forward_auth())
+
+    created = len(events)
+    if created:
+        status = 201
+    elif any(result['status'] == 'conflict' for result in results):
+        status = 409
+    else:
+        status = 400   # every item was malformed
+    return jsonify({'created': created, 'failed': len(results) - created, 'results': results}), status
+
+@app.route('/bookings', methods=['GET'])
+@verifier.require_auth()
+def list_bookings():
+    # Bulk lookup: GET /bookings?ids=1,2,3 (unknown ids are simply absent)
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i}
+    except ValueError:
+        return jsonify({'error': 'ids must be comma-separated integers'}), 400
+    if len(ids) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'at most {MAX_BATCH_ITEMS} ids per request'}), 400
+    query = Booking.query.filter(Booking.id.in_(ids))
+    if g.claims['role'] not in STAFF_ROLES:
+        query = query.filter(Booking.user_id == g.claims['id'])
+    bookings = query.all() if ids else []
+    return jsonify([b.to_dict() for b in bookings])
+
 @app.route('/bookings/<int:booking_id>', methods=['GET'])
+@verifier.require_auth()
 def get_booking(booking_id):
     booking = Booking.query.get_or_404(booking_id)
+    if not acts_for(booking.user_id):
+        return jsonify({'error': 'Booking not found'}), 404
     return jsonify(booking.to_dict())
 
 if __name__ == '__main__':
-    db.create_all()
+    with app.app_context():
+        upgrade()
     port = int(os.getenv('PORT', 5003))
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
@@ -1,66 +1,191 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_mail import Mail, Message
+from concurrent.futures import ThreadPoolExecutor
 import os
-import requests
+import smtplib
+import sys
+
+# Shared modules (http_client, instrumentation, ...) live at the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from http_client import ServiceClient, ServiceUnavailable  # noqa: E402
+import instrumentation  # noqa: E402
+from token_auth import TokenVerifier, forward_auth  # noqa: E402
 
 app = Flask(__name__)
 
 # Email Configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', '1') in ('1', 'true', 'True')
 app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
 
 mail = Mail(app)
+instrumentation.init_app(app, 'notification')
+auth = ServiceClient(os.getenv('AUTH_SERVICE_URL'))
+bookings = ServiceClient(os.getenv('BOOKING_SERVICE_URL'))
+# Callers pass on the user's access token; its claims replace the auth-service
+# lookup for the user's own notifications (see token_auth.py)
+verifier = TokenVerifier()
+# Roles that may notify other users, whose details are still looked up
+STAFF_ROLES = ('admin', 'staff')
 
-@app.route('/notifications/health')
-def health_check():
-    return jsonify({'status': 'healthy', 'service': 'notification'})
+# Bulk lookups are split into chunks of this many ids, fetched concurrently
+LOOKUP_CHUNK_SIZE = 200
+lookup_pool = ThreadPoolExecutor(max_workers=int(os.getenv('LOOKUP_WORKERS', 8)))
 
-@app.route('/notifications', methods=['POST'])
-def send_notification():
-    data = request.json
-    
-    if data['type'] == 'booking_created':
-        # Get user details from auth service
-        auth_url = f"{os.getenv('AUTH_SERVICE_URL')}/users/{data['user_id']}"
-        user_response = requests.get(auth_url)
-        if user_response.status_code != 200:
-            return jsonify({'error': 'User not found'}), 404
-        
-        user = user_response.json()
-        
-        # Get booking details from booking service
-        booking_url = f"{os.getenv('BOOKING_SERVICE_URL')}/bookings/{data['booking_id']}"
-        booking_response = requests.get(booking_url)
-        if booking_response.status_code != 200:
-            return jsonify({'error': 'Booking not found'}), 404
-        
-        booking = booking_response.json()
-        
-        # Send email
-        msg = Message(
-            'Booking Confirmation',
-            recipients=[user['email']]
-        )
-        msg.body = f"""
+
+def confirmation_message(user, booking):
+    msg = Message(
+        'Booking Confirmation',
+        recipients=[user['email']]
+    )
+    msg.body = f"""
         Dear {user['name']},
-        
+
         Your booking has been confirmed.
         Date: {booking['start_time']}
         Duration: {booking['end_time']}
-        
+
         Thank you for using our service!
         """
-        
-        mail.send(msg)
-        
+    return msg
+
+
+def well_formed(event):
+    """An event is a dict with integer ``user_id`` and ``booking_id``."""
+    return isinstance(event, dict) and all(
+        isinstance(event.get(key), int) and not isinstance(event.get(key), bool) for key in ('user_id', 'booking_id'))
+
+
+def token_user(claims):
+    return {'id': claims['id'], 'email': claims['email'], 'name': claims['name'], 'role': claims['role']}
+
+
+def start_bulk_lookup(client, path, ids, headers=None):
+    """Start ``GET path?ids=...`` requests for ``ids`` in chunks; returns the futures."""
+    ids = sorted(ids)
+    return [
+        lookup_pool.submit(client.get, path, params={'ids': ','.join(map(str, ids[i:i + LOOKUP_CHUNK_SIZE]))},
+                           headers=headers)
+        for i in range(0, len(ids), LOOKUP_CHUNK_SIZE)
+    ]
+
+
+def collect_bulk_lookup(futures):
+    found = {}
+    for future in futures:
+        response = future.result()
+        if response.status_code == 200:
+            found.update({record['id']: record for record in response.json()})
+    return found
+
+
+@app.route('/notifications/health')
+def health_check():
+    return jsonify({'status': 'healthy', 'service': 'notification'})
+
+@app.route('/notifications', methods=['POST'])
+@verifier.require_auth()
+def send_notification():
+    data = request.get_json(silent=True)
+    if not well_formed(data):
+        return jsonify({'error': 'user_id and booking_id must be integers'}), 400
+
+    if data.get('type') == 'booking_created':
+        own = data['user_id'] == g.claims['id']
+        if not own and g.claims['role'] not in STAFF_ROLES:
+            return jsonify({'error': 'Forbidden'}), 403
+        try:
+            # The caller's own details come with their token, anyone else's from the auth service
+            if own:
+                user = token_user(g.claims)
+            else:
+                user_response = auth.get(f"/users/{data['user_id']}", headers=forward_auth())
+                if user_response.status_code != 200:
+                    return jsonify({'error': 'User not found'}), 404
+                user = user_response.json()
+            booking_response = bookings.get(f"/bookings/{data['booking_id']}", headers=forward_auth())
+            if booking_response.status_code != 200 or booking_response.json()['user_id'] != user['id']:
+                return jsonify({'error': 'Booking not found'}), 404
+        except ServiceUnavailable:
+            return jsonify({'error': 'Lookup service unavailable'}), 503
+
+        try:
+            mail.send(confirmation_message(user, booking_response.json()))
+        except (smtplib.SMTPException, OSError):
+            return jsonify({'error': 'Mail server unavailable'}), 503
+
         return jsonify({'status': 'notification sent'})
-    
+
     return jsonify({'error': 'Invalid notification type'}), 400
 
+@app.route('/notifications/batch', methods=['POST'])
+@verifier.require_auth()
+def send_notifications_batch():
+    """Send many notifications: deduplicated bulk lookups, one SMTP session.
+
+    Body: ``{"events": [{"type": "booking_created", "user_id": ..., "booking_id": ...}, ...]}``.
+    Returns a per-event status list in request order.
+    """
+    events = (request.get_json(silent=True) or {}).get('events') or []
+    if not isinstance(events, list):
+        return jsonify({'error': 'events must be a list'}), 400
+    if len(events) > 5000:
+        return jsonify({'error': 'at most 5000 events per batch'}), 400
+
+    valid = [e for e in events if well_formed(e) and e.get('type') == 'booking_created']
+    # the caller's own details come with their token; staff and admins may notify others
+    users = {g.claims['id']: token_user(g.claims)}
+    others = {e['user_id'] for e in valid} - set(users) if g.claims['role'] in STAFF_ROLES else set()
+    try:
+        # both services are queried at the same time, each id only once
+        user_futures = start_bulk_lookup(auth, '/users', others, forward_auth())
+        booking_futures = start_bulk_lookup(bookings, '/bookings', {e['booking_id'] for e in valid}, forward_auth())
+        users.update(collect_bulk_lookup(user_futures))
+        booking_records = collect_bulk_lookup(booking_futures)
+    except ServiceUnavailable:
+        return jsonify({'error': 'Lookup service unavailable'}), 503
+
+    results, outgoing = [None] * len(events), []
+    for i, event in enumerate(events):
+        if not well_formed(event):
+            results[i] = {'status': 'invalid', 'error': 'user_id and booking_id must be integers'}
+            continue
+        if event.get('type') != 'booking_created':
+            results[i] = {'status': 'error', 'error': 'Invalid notification type'}
+            continue
+        user = users.get(event['user_id'])
+        booking = booking_records.get(event['booking_id'])
+        if booking is not None and booking['user_id'] != event['user_id']:
+            booking = None
+        if user is None and g.claims['role'] not in STAFF_ROLES:
+            results[i] = {'status': 'error', 'error': 'Forbidden'}
+        elif user is None or booking is None:
+            results[i] = {'status': 'error', 'error': 'User not found' if user is None else 'Booking not found'}
+        else:
+            outgoing.append((i, confirmation_message(user, booking)))
+
+    if outgoing:
+        try:
+            with mail.connect() as conn:
+                for i, msg in outgoing:
+                    try:
+                        conn.send(msg)
+                        results[i] = {'status': 'notification sent'}
+                    except Exception as e:
+                        results[i] = {'status': 'error', 'error': str(e)}
+        except (smtplib.SMTPException, OSError):
+            if not any(results[i] for i, _ in outgoing):
+                return jsonify({'error': 'Mail server unavailable'}), 503
+            # the connection dropped part way: report what was not sent
+            for i, _ in outgoing:
+                results[i] = results[i] or {'status': 'error', 'error': 'Mail server unavailable'}
+
+    sent = sum(1 for r in results if r['status'] == 'notification sent')
+    return jsonify({'sent': sent, 'failed': len(results) - sent, 'results': results})
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5004))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port)
@@ -1,12 +1,67 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, url_for
 from flask_sqlalchemy import SQLAlchemy
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Shared modules (storage, ...) live at the repository root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import instrumentation  # noqa: E402
+import search  # noqa: E402
+from http_caching import is_fresh, set_validators  # noqa: E402
+import storage  # noqa: E402
+from token_auth import TokenVerifier  # noqa: E402
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///services.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+storage.configure(app, 'sqlite:///services.db')
 
 db = SQLAlchemy(app)
+instrumentation.init_app(app, 'catalog')
+# Catalog reads are public; operational endpoints need an admin access token
+verifier = TokenVerifier()
+
+# Catalog pages change a few times a day: keep rendered pages in a small LRU with TTL
+CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 256))
+# Clients and proxies may reuse a response this long before revalidating with If-None-Match
+HTTP_MAX_AGE = int(os.getenv('CATALOG_HTTP_MAX_AGE', 60))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {'hits': 0, 'misses': 0}
+
+
+def cached(key, loader):
+    """Return ``(value, etag, loaded_at)``; the ETag is a digest of the value."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(key)
+            cache_stats['hits'] += 1
+            return entry[1:]
+    cache_stats['misses'] += 1
+    value = loader()
+    etag = hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:20]
+    entry = (now + CACHE_TTL, value, etag, datetime.now(timezone.utc))
+    with _cache_lock:
+        _cache[key] = entry
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return entry[1:]
+
+
+def cacheable(payload, etag, loaded_at):
+    """JSON response for a cached payload, or a bare 304 if the client has it."""
+    headers = {'etag': etag, 'last_modified': loaded_at, 'cache_control': f'public, max-age={HTTP_MAX_AGE}'}
+    if is_fresh(etag, loaded_at):
+        return set_validators(Response(status=304), **headers)
+    return set_validators(jsonify(payload), **headers)
+
 
 class Service(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,12 +97,47 @@ class ServiceCategory(db.Model):
 def health_check():
     return jsonify({'status': 'healthy', 'service': 'service-catalog'})
 
+@app.route('/services/<int:service_id>')
+def get_service(service_id):
+    return cacheable(*cached(('service', service_id), lambda: Service.query.get_or_404(service_id).to_dict()))
+
+@app.route('/services/cache-stats')
+@verifier.require_auth('admin')
+def get_cache_stats():
+    return jsonify(cache_stats)
+
 @app.route('/services')
 def list_services():
-    services = Service.query.all()
-    return jsonify([s.to_dict() for s in services])
+    # Keyset pagination on id; the next page is advertised in the Link header.
+    # With ?q= results are ranked by relevance and the cursor is a row offset.
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    cursor = request.args.get('cursor', type=int)
+    filters = search.filters_from(request.args)
+
+    def load():
+        query, rank = search.apply(Service.query, Service, db.session, **filters)
+        if rank is not None:
+            query = query.order_by(rank, Service.id).offset(cursor or 0)
+        else:
+            if cursor is not None:
+                query = query.filter(Service.id > cursor)
+            query = query.order_by(Service.id)
+        return [s.to_dict() for s in query.limit(limit + 1)]
+
+    services, etag, loaded_at = cached(('services', tuple(sorted(filters.items())), cursor, limit), load)
+    response = cacheable(services[:limit], etag, loaded_at)
+    if len(services) > limit:
+        next_cursor = (cursor or 0) + limit if filters['q'] else services[limit - 1]['id']
+        args = {k: v for k, v in request.args.items() if k != 'cursor'}
+        next_url = url_for('list_services', **dict(args, cursor=next_cursor, limit=limit))
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
 
 if __name__ == '__main__':
-    db.create_all()
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            search.create_index(conn)
     port = int(os.getenv('PORT', 5002))
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
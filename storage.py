@@ -0,0 +1,76 @@
+"""
+Database engine configuration shared by the monolith and the microservices.
+
+``configure(app, default_url)`` sets the database URI and engine options from
+the environment:
+
+* SQLite gets per-connection PRAGMAs. The default ``SQLITE_PROFILE=wal`` uses
+  write-ahead logging, so readers do not block the writer, plus
+  ``synchronous=NORMAL``, a ``busy_timeout`` so writers wait for the lock
+  instead of failing with "database is locked", and memory-mapped reads.
+  ``SQLITE_PROFILE=default`` keeps SQLite's own settings. Single PRAGMAs can
+  be overridden with ``SQLITE_JOURNAL_MODE``, ``SQLITE_SYNCHRONOUS``,
+  ``SQLITE_BUSY_TIMEOUT_MS`` and ``SQLITE_MMAP_SIZE``.
+* Server databases (PostgreSQL, MySQL) get a connection pool sized by
+  ``DB_POOL_SIZE``/``DB_MAX_OVERFLOW``, with pre-ping, ``DB_POOL_RECYCLE``
+  and ``DB_POOL_TIMEOUT``.
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+SQLITE_PROFILES = {
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 5000, 'mmap_size': 256 * 1024 * 1024},
+    'default': {},
+}
+
+# PRAGMAs applied to every new SQLite connection in this process
+_sqlite_pragmas = {}
+
+
+def sqlite_pragmas():
+    pragmas = dict(SQLITE_PROFILES[os.getenv('SQLITE_PROFILE', 'wal')])
+    for name, var in (('journal_mode', 'SQLITE_JOURNAL_MODE'), ('synchronous', 'SQLITE_SYNCHRONOUS'),
+                      ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS'), ('mmap_size', 'SQLITE_MMAP_SIZE')):
+        if os.getenv(var):
+            pragmas[name] = os.getenv(var)
+    return pragmas
+
+
+def engine_options(url):
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') in ('1', 'true', 'True'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
+
+def configure(app, default_url):
+    """Point ``app`` at ``DATABASE_URL`` (or ``default_url``) with the storage profile applied."""
+    url = os.getenv('DATABASE_URL', default_url)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    if make_url(url).get_backend_name() == 'sqlite':
+        _sqlite_pragmas.clear()
+        _sqlite_pragmas.update(sqlite_pragmas())
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not _sqlite_pragmas or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas.items():
+        try:
+            cursor.execute(f'PRAGMA {name}={value}')
+        except sqlite3.OperationalError:
+            # read-only connections (replicas) cannot switch the journal mode
+            pass
+    cursor.close()
@@ -0,0 +1,217 @@
+"""
+Local verification of the access tokens issued by the auth service.
+
+The auth service signs short-lived JWTs (``POST /auth/token``) whose claims
+carry the user's ``id``, ``email``, ``name`` and ``role``. ``TokenVerifier``
+checks them inside each service, without a call to the auth service per
+request:
+
+* Keys are chosen by the token's ``kid`` header. With HMAC
+  (``JWT_ALGORITHM=HS256``, the default) they are the shared
+  ``JWT_SECRET_KEYS`` (``kid:secret,...``, newest first; the newest signs).
+  With RS256/ES256 the public keys are fetched from
+  ``AUTH_SERVICE_URL/auth/keys`` and cached; a token with an unknown ``kid``
+  triggers a refresh, at most every ``KEY_REFRESH_SECONDS``. Rotating is
+  putting a new key first, then dropping the old one once its tokens expired.
+* Revocations (a logged-out token, or every token of a user issued up to a
+  point) are polled from ``AUTH_SERVICE_URL/auth/revocations`` every
+  ``JWT_REVOCATION_POLL_SECONDS`` by a background thread, which also
+  refreshes the public keys. The poll is authenticated with the shared
+  ``SERVICE_AUTH_KEY`` in the ``X-Service-Key`` header.
+
+``require_auth(*roles)`` guards a view: 401 without a valid bearer token, 403
+when the token's role is not in ``roles``, otherwise the claims are in
+``g.claims``. ``forward_auth()`` gives the headers that pass the caller's
+token on to another service.
+"""
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+import jwt
+from flask import g, jsonify, request
+
+from http_client import ServiceClient, ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+ISSUER = 'auth-service'
+HMAC_ALGORITHMS = ('HS256', 'HS384', 'HS512')
+KEY_REFRESH_SECONDS = 10
+SERVICE_KEY_HEADER = 'X-Service-Key'
+
+
+class TokenError(Exception):
+    """The token is malformed, expired, revoked or signed with an unknown key."""
+
+
+def parse_keys(value):
+    """``'kid:value,kid2:value2'`` -> ``{kid: value}`` in the same order."""
+    keys = {}
+    for item in (value or '').split(','):
+        kid, sep, key = item.strip().partition(':')
+        if sep and kid and key:
+            keys[kid] = key
+    return keys
+
+
+def algorithm():
+    return os.getenv('JWT_ALGORITHM', 'HS256')
+
+
+def hmac_keys():
+    """Shared HMAC secrets by ``kid``, newest first."""
+    return parse_keys(os.getenv('JWT_SECRET_KEYS')) or {'default': os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret')}
+
+
+def service_key():
+    """Secret shared by the services for service-to-service calls that act for no user."""
+    return os.getenv('SERVICE_AUTH_KEY', 'dev-service-key')
+
+
+def forward_auth():
+    """Headers passing the current request's bearer token on to another service."""
+    header = request.headers.get('Authorization')
+    return {'Authorization': header} if header else {}
+
+
+class TokenVerifier:
+    def __init__(self, auth_url=None, poll_seconds=None, leeway=None):
+        self.algorithm = algorithm()
+        self.auth = ServiceClient(auth_url if auth_url is not None else os.getenv('AUTH_SERVICE_URL'))
+        self.poll_seconds = poll_seconds or float(os.getenv('JWT_REVOCATION_POLL_SECONDS', 30))
+        self.leeway = leeway if leeway is not None else float(os.getenv('JWT_LEEWAY_SECONDS', 10))
+        self._keys = hmac_keys() if self.algorithm in HMAC_ALGORITHMS else {}
+        self._keys_fetched_at = 0.0
+        # jti -> exp, and user id -> (tokens issued up to this are revoked, entry expiry)
+        self._revoked = {}
+        self._revoked_users = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._poller = None
+        self.polled_at = None
+
+    def verify(self, token):
+        """Claims of a valid, unrevoked access token; raises ``TokenError`` otherwise."""
+        self._ensure_poller()
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenError(str(e)) from e
+        key = self._key(kid)
+        if key is None:
+            raise TokenError('unknown signing key')
+        try:
+            claims = jwt.decode(token, key, algorithms=[self.algorithm], issuer=ISSUER, leeway=self.leeway,
+                                options={'require': ['exp', 'iat', 'jti', 'sub']})
+        except jwt.InvalidTokenError as e:
+            raise TokenError(str(e)) from e
+        if claims.get('type') != 'access':
+            raise TokenError('not an access token')
+        if claims['jti'] in self._revoked:
+            raise TokenError('token revoked')
+        revoked_user = self._revoked_users.get(claims.get('id'))
+        if revoked_user is not None and claims['iat'] <= revoked_user[0]:
+            raise TokenError('token revoked')
+        return claims
+
+    def require_auth(self, *roles):
+        """View decorator: a valid bearer token, with one of ``roles`` if given."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+                if scheme.lower() != 'bearer' or not token.strip():
+                    return jsonify({'error': 'Missing bearer token'}), 401, {'WWW-Authenticate': 'Bearer'}
+                try:
+                    g.claims = self.verify(token.strip())
+                except TokenError as e:
+                    return jsonify({'error': f'Invalid token: {e}'}), 401, {'WWW-Authenticate': 'Bearer'}
+                if roles and g.claims.get('role') not in roles:
+                    return jsonify({'error': 'Forbidden'}), 403
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'algorithm': self.algorithm,
+            'keys': list(self._keys),
+            'revoked_tokens': len(self._revoked),
+            'revoked_users': len(self._revoked_users),
+            'polled_at': self.polled_at,
+        }
+
+    # Keys and revocations
+
+    def _key(self, kid):
+        key = self._keys.get(kid)
+        if key is None and self.algorithm not in HMAC_ALGORITHMS \
+                and time.monotonic() - self._keys_fetched_at >= KEY_REFRESH_SECONDS:
+            self._refresh_keys()
+            key = self._keys.get(kid)
+        return key
+
+    def _refresh_keys(self):
+        self._keys_fetched_at = time.monotonic()
+        try:
+            response = self.auth.get('/auth/keys')
+        except ServiceUnavailable as e:
+            logger.warning('Fetching signing keys failed: %s', e)
+            return
+        if response.status_code == 200:
+            self._keys = {k['kid']: k['key'] for k in response.json()['keys']}
+        else:
+            logger.warning('Fetching signing keys failed: HTTP %s', response.status_code)
+
+    def _ensure_poller(self):
+        if self._poller is not None or not self.auth.base_url:
+            return
+        with self._lock:
+            if self._poller is not None:
+                return
+            # the first poll runs before any token is accepted
+            self._poll()
+            self._poller = threading.Thread(target=self._poll_loop, name='token-revocations', daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self._poll()
+            except Exception:
+                logger.exception('Revocation poll failed')
+
+    def _poll(self):
+        if self.algorithm not in HMAC_ALGORITHMS:
+            self._refresh_keys()
+        now = time.time()
+        revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        revoked_users = {user: entry for user, entry in self._revoked_users.items() if entry[1] > now}
+        cursor = self._cursor
+        while True:
+            try:
+                response = self.auth.get('/auth/revocations', params={'since': cursor},
+                                         headers={SERVICE_KEY_HEADER: service_key()})
+            except ServiceUnavailable as e:
+                logger.warning('Revocation poll failed: %s', e)
+                return
+            if response.status_code != 200:
+                logger.warning('Revocation poll failed: HTTP %s', response.status_code)
+                return
+            data = response.json()
+            for item in data['revoked']:
+                if item['jti']:
+                    revoked[item['jti']] = item['expires_at']
+                else:
+                    before, expires_at = revoked_users.get(item['user_id'], (0, 0))
+                    revoked_users[item['user_id']] = (max(before, item['before']), max(expires_at, item['expires_at']))
+            cursor = data['cursor']
+            if not data['more']:
+                break
+        # swapped whole, so verify() never sees a half-applied poll
+        self._revoked, self._revoked_users, self._cursor = revoked, revoked_users, cursor
+        self.polled_at = now